@@ -0,0 +1,142 @@
+__author__ = "Devrim Celik"
+
+"""
+Accuracy versus cost of the adaptive integrators compared with the fixed-step
+loops. LIF is checked against its exact spike times, Izhikevich against a
+tight-tolerance DOP853 reference with exact event location. Cost is given as
+steps (right hand side evaluations for the adaptive Izhikevich) and wall time,
+accuracy as the largest spike-time error.
+
+Run with: python -m Benchmarks.Adaptive_Benchmark
+"""
+
+import time as timer
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+from Models.Kernels import get_kernel
+from Models import LIF_Interactive, Izhikevich_Interactive
+from Models.LIF_Interactive import LIF_adaptive
+
+LIF_PARAMS      =   (0.02, 0.16, 0.0049)                # _I, gl, Cm
+IZ_PARAMS       =   (10, 0.02, 0.2, -50, 2)             # _I, a, b, c, d (chattering)
+
+#==============================================================================#
+
+def time_call(func, repeats=3):
+    func()                                  # warm-up (triggers JIT compile)
+    start = timer.perf_counter()
+    for _ in range(repeats):
+        out = func()
+    return (timer.perf_counter() - start) / repeats, out
+
+
+def spike_error(spikes, reference):
+    # largest spike-time difference, or the difference in spike count
+    if len(spikes) != len(reference):
+        return "{:+d} spikes".format(len(spikes) - len(reference))
+    if len(spikes) == 0:
+        return "0"
+    return "{:.3g}".format(np.max(np.abs(spikes - reference)))
+
+
+def report(name, steps, seconds, error):
+    print("  {:<24} {:>9d} steps {:9.3f} ms   spike error: {}".format(
+        name, steps, seconds * 1e3, error))
+
+######### LIF
+def LIF_fixed(_I, gl, Cm, dt):
+    El, thresh, T = -0.065, -0.050, 0.100
+    indices = np.arange(len(np.arange(0, T+dt, dt)))
+    V = np.empty(len(indices))
+    V[0] = El
+    # the loop uses I[i] for the step into sample i, so the window is shifted
+    # by one sample to match the current edges of the exact solution
+    I = _I * LIF_Interactive.PROTOCOL.values(indices - 1, dt)
+    spike_index = np.empty(len(V), dtype=np.int64)
+    spikes = get_kernel("LIF")(V, I, gl, Cm, El, thresh, dt, spike_index)
+    # the threshold is crossed between the peak sample and the next one
+    return len(V) - 1, (spike_index[:spikes] + 1) * dt
+
+
+def LIF_benchmark():
+    print("LIF (_I, gl, Cm = {})".format(LIF_PARAMS))
+    _, (_, _, reference) = time_call(lambda: LIF_adaptive(*LIF_PARAMS, return_spikes=True))
+    for dt in (1e-4, 2e-5, 5e-6, 1e-6):
+        seconds, (steps, spikes) = time_call(lambda: LIF_fixed(*LIF_PARAMS, dt))
+        report("fixed dt={:g}".format(dt), steps, seconds, spike_error(spikes, reference))
+    for max_step in (np.inf, 1e-3):
+        seconds, (time, _, spikes) = time_call(
+            lambda: LIF_adaptive(*LIF_PARAMS, max_step=max_step, return_spikes=True))
+        report("exact max_step={:g}".format(max_step), len(time) - 1, seconds,
+               spike_error(spikes, reference))
+
+######### Izhikevich
+def Izhikevich_reference(_I, a, b, c, d, spike_value=35, tol=1e-12):
+    # DOP853 between the current edges, restarted at every spike event
+    def rhs(t, X, I):
+        V, u = X
+        return [(0.04*V + 5)*V + 140 - u + I, a*(b*V - u)]
+
+    def spike(t, X, I):
+        return X[0] - spike_value
+    spike.terminal = True
+    spike.direction = 1
+
+    X = [-70., -14.]
+    spikes = []
+    for t_start, t_end, I in ((0, 100, 0.), (100, 750, _I), (750, 1000, 0.)):
+        t = t_start
+        while t < t_end:
+            sol = solve_ivp(rhs, (t, t_end), X, method="DOP853", args=(I,),
+                            events=spike, rtol=tol, atol=tol)
+            if sol.status == 1:
+                t = sol.t_events[0][0]
+                V, u = sol.y_events[0][0]
+                spikes.append(t)
+                X = [c, u + d]
+            else:
+                t = t_end
+                X = sol.y[:, -1]
+    return np.array(spikes)
+
+
+def Izhikevich_fixed(_I, a, b, c, d, dt, spike_value=35):
+    indices = np.arange(len(np.arange(0, 1000+dt, dt)))
+    V, u = np.empty(len(indices)), np.empty(len(indices))
+    V[0], u[0] = -70, -14
+    I = _I * Izhikevich_Interactive.PROTOCOL.values(indices, dt)
+    spike_index = np.empty(len(V), dtype=np.int64)
+    spikes = get_kernel("Izhikevich")(V, u, I, a, b, c, d, spike_value, dt, spike_index)
+    return len(V) - 1, indices[spike_index[:spikes]] * dt
+
+
+def Izhikevich_benchmark():
+    print("Izhikevich (_I, a, b, c, d = {})".format(IZ_PARAMS))
+    reference = Izhikevich_reference(*IZ_PARAMS)
+    for dt in (0.5, 0.1, 0.01):
+        seconds, (steps, spikes) = time_call(lambda: Izhikevich_fixed(*IZ_PARAMS, dt))
+        report("fixed dt={:g}".format(dt), steps, seconds, spike_error(spikes, reference))
+
+    edges, levels = (np.array(part, dtype=float) for part in
+                     Izhikevich_Interactive.PROTOCOL.segments(IZ_PARAMS[0]))
+    kernel = get_kernel("Izhikevich_adaptive")
+    for tol in (1e-3, 1e-4, 1e-6, 1e-8):
+        def run():
+            out = [np.empty(2**18) for _ in range(4)]
+            n, spikes, nfev = kernel(edges, levels, -70., -14., *IZ_PARAMS[1:], 35, 1000,
+                                     tol, tol, np.inf, *out)
+            return nfev, out[3][:spikes]
+        seconds, (nfev, spikes) = time_call(run)
+        report("adaptive tol={:g}".format(tol), nfev, seconds, spike_error(spikes, reference))
+
+
+def run_benchmark():
+    LIF_benchmark()
+    Izhikevich_benchmark()
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
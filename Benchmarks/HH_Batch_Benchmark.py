@@ -0,0 +1,66 @@
+__author__ = "Devrim Celik"
+
+"""
+Throughput of the vectorized multi-cell Hodgkin-Huxley engine (HH_batch) on a
+g_Na / g_K sweep, against N sequential HH calls (odeint and Rush-Larsen). The
+sequential cost is measured on a few cells and scaled to N. Every batch is
+checked to give the spike counts of the sequential Rush-Larsen runs.
+
+Run with: python -m Benchmarks.HH_Batch_Benchmark
+"""
+
+import time as timer
+
+import numpy as np
+
+from Models.Hodgkin_Huxley_Interactive import HH, HH_batch
+
+CELLS       =   (1, 10, 100, 1000, 4000)
+SEQUENTIAL  =   8                           # cells timed one by one
+
+#==============================================================================#
+
+def sweep(N, seed=0):
+    # random conductances around the defaults, and a suprathreshold current;
+    # drawn cell by cell, so the first cells are the same for every N
+    g_Na, g_K = np.random.default_rng(seed).uniform((80, 20), (160, 50), (N, 2)).T
+    return {"_I": 10., "g_Na": g_Na, "g_K": g_K}
+
+
+def sequential(params, solver):
+    # seconds per cell and spike counts of single HH calls
+    N = len(params["g_Na"])
+    counts = []
+    start = timer.perf_counter()
+    for k in range(N):
+        out = HH(params["_I"], g_Na=params["g_Na"][k], g_K=params["g_K"][k],
+                 solver=solver, return_spikes=True)
+        counts.append(len(out[-1]))
+    return (timer.perf_counter() - start) / N, counts
+
+
+def run_benchmark():
+    per_cell = {}
+    for solver in ("odeint", "rush_larsen"):
+        per_cell[solver], reference = sequential(sweep(SEQUENTIAL), solver)
+        print("sequential HH ({}): {:8.1f} ms per cell".format(solver, per_cell[solver] * 1e3))
+
+    print("\n{:>6} {:>11} {:>14} {:>16} {:>16}".format(
+        "cells", "batch [s]", "per cell [ms]", "vs odeint", "vs rush_larsen"))
+    for N in CELLS:
+        params = sweep(N)
+        start = timer.perf_counter()
+        V, m, h, n, spikes = HH_batch(params["_I"], g_Na=params["g_Na"], g_K=params["g_K"],
+                                      return_spikes=True)
+        seconds = timer.perf_counter() - start
+        counts = [len(cell) for cell in spikes[:SEQUENTIAL]]
+        expected = reference[:len(counts)]
+        print("{:>6} {:>11.3f} {:>14.3f} {:>15.1f}x {:>15.1f}x{}".format(
+            N, seconds, seconds / N * 1e3,
+            per_cell["odeint"] * N / seconds, per_cell["rush_larsen"] * N / seconds,
+            "" if counts == expected else "   spike counts differ!"))
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
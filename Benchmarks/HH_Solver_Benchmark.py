@@ -0,0 +1,80 @@
+__author__ = "Devrim Celik"
+
+"""
+Compares the integrators available for the Hodgkin-Huxley model on the 400 ms
+protocol: RHS evaluations, Jacobian evaluations, wall time and the maximal
+voltage deviation from a tightly integrated reference solution. A second
+table compares integrating straight through the stimulus step with
+restarting the solver at the protocol breakpoints.
+
+Run with: python -m Benchmarks.HH_Solver_Benchmark
+"""
+
+import time as timer
+
+import numpy as np
+from scipy.integrate import odeint
+
+from Models.Hodgkin_Huxley_Interactive import (HH_rhs, HH_jacobian,
+                                               integrate_HH, step_protocol,
+                                               SOLVERS)
+
+#==============================================================================#
+
+def run_benchmark(_I=7, repeats=3):
+    T       =       400                       # total simulation length
+    dt      =       0.1                       # step size
+    time    =       np.arange(0, T+dt, dt)    # step values
+
+    X0 = [-65, 0.05, 0.6, 0.32]
+    params = (120., 36., 0.3, 50., -77., -54.387)
+    protocol = step_protocol(_I)
+
+    reference, _ = integrate_HH(params, X0, time, protocol, tolerance=1e-11)
+    reference = reference[:, 0]
+
+    configurations = [(solver, {}) for solver in SOLVERS if solver != "rush_larsen"]
+    configurations += [("rush_larsen", {"substeps": substeps}) for substeps in (4, 20, 50)]
+
+    print("{:<22} {:>8} {:>6} {:>11} {:>14}".format(
+        "solver", "RHS", "Jac", "wall [ms]", "max |dV| [mV]"))
+    for solver, options in configurations:
+        start = timer.perf_counter()
+        for _ in range(repeats):
+            states, info = integrate_HH(params, X0, time, protocol,
+                                        solver=solver, **options)
+        wall = (timer.perf_counter() - start) / repeats
+
+        name = solver if not options else "{} (dt={:g})".format(
+            solver, dt / options["substeps"])
+        print("{:<22} {:>8} {:>6} {:>11.1f} {:>14.4g}".format(
+            name, info["nfev"], info["njev"], wall * 1e3,
+            np.max(np.abs(states[:, 0] - reference))))
+
+
+def run_stimulus_benchmark(currents=(3, 7, 15)):
+    T       =       400                       # total simulation length
+    dt      =       0.1                       # step size
+    time    =       np.arange(0, T+dt, dt)    # step values
+
+    X0 = [-65, 0.05, 0.6, 0.32]
+    params = (120., 36., 0.3, 50., -77., -54.387)
+
+    # stimulus step inside the right-hand side, as odeint would see it
+    # without breakpoints
+    def discontinuous_rhs(t, X, _I, *params):
+        breakpoints, levels = step_protocol(_I)
+        return HH_rhs(t, X, levels[np.searchsorted(breakpoints, t)], *params)
+
+    print("\n{:<8} {:>18} {:>18}".format("I_ext", "RHS single pass", "RHS segmented"))
+    for _I in currents:
+        _, info = odeint(discontinuous_rhs, X0, time, args=(_I,) + params,
+                         Dfun=HH_jacobian, tfirst=True, full_output=True)
+        _, segmented = integrate_HH(params, X0, time, step_protocol(_I))
+        print("{:<8} {:>18} {:>18}".format(_I, info["nfe"][-1], segmented["nfev"]))
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
+    run_stimulus_benchmark()
@@ -0,0 +1,66 @@
+__author__ = "Devrim Celik"
+
+"""
+Compares the compiled (Numba) and pure-Python step loops of the LIF,
+FitzHugh-Nagumo and Izhikevich models: wall time per call and the maximal
+deviation between both backends.
+
+Run with: python -m Benchmarks.Kernel_Benchmark
+"""
+
+import time as timer
+
+import numpy as np
+
+from Models import Kernels
+from Models.LIF_Interactive import LIF
+from Models.FitzHugh_Nagumo_Interactive import FitzHugh_Nagumo
+from Models.Izhikevich_Interactive import Izhikevich_Model
+
+# compiled and Python results have to agree within this (absolute) tolerance;
+# without fastmath both backends round alike, but LLVM may still evaluate
+# e.g. V**3 differently, so they agree to round-off (FitzHugh-Nagumo ~1e-15)
+TOLERANCE = 1e-9
+
+#==============================================================================#
+
+def time_call(func, repeats=5):
+    func()                                  # warm-up (triggers JIT compile)
+    start = timer.perf_counter()
+    for _ in range(repeats):
+        out = func()
+    return (timer.perf_counter() - start) / repeats, out
+
+
+def run_benchmark():
+    models = [
+        ("LIF",             lambda: LIF(0.005, 0.16, 0.0049)),
+        ("FitzHugh-Nagumo", lambda: np.concatenate(FitzHugh_Nagumo(0.5))),
+        ("Izhikevich",      lambda: Izhikevich_Model(10, 0.02, 0.2, -50, 2)),
+    ]
+
+    backends = ["python"] + (["numba"] if Kernels.NUMBA_AVAILABLE else [])
+    if not Kernels.NUMBA_AVAILABLE:
+        print("Numba is not installed, only the Python backend is timed.")
+
+    previous_backend = Kernels.backend
+    try:
+        for name, func in models:
+            results = {}
+            for backend in backends:
+                Kernels.set_backend(backend)
+                results[backend] = time_call(func)
+            line = "{:<16} python: {:8.3f} ms".format(name, results["python"][0] * 1e3)
+            if "numba" in results:
+                deviation = np.max(np.abs(results["numba"][1] - results["python"][1]))
+                line += "   numba: {:8.3f} ms   max |diff|: {:.3g} ({})".format(
+                    results["numba"][0] * 1e3, deviation,
+                    "ok" if deviation <= TOLERANCE else "MISMATCH")
+            print(line)
+    finally:
+        Kernels.backend = previous_backend
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
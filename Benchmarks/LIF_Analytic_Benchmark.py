@@ -0,0 +1,72 @@
+__author__ = "Devrim Celik"
+
+"""
+Sweeps random (I, gl, Cm) combinations, drawn from the slider ranges of the
+LIF simulator, with the closed-form solution and compares the cost per
+combination with the time-stepping loop. Closed-form spike times are checked
+against the event-driven exact integrator, the spike counts against the
+Euler loop (which differs by its discretization error).
+
+Run with: python -m Benchmarks.LIF_Analytic_Benchmark
+"""
+
+import time as timer
+
+import numpy as np
+
+from Models.LIF_Interactive import LIF, LIF_adaptive, LIF_spike_times, LIF_trace
+
+N_ANALYTIC  =   1000000             # combinations swept in closed form
+N_LOOP      =   200                 # combinations run through the loops
+
+#==============================================================================#
+
+def random_parameters(N, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(-0.01, 0.03, N),         # _I
+            rng.uniform(0.01, 0.3, N),           # gl
+            rng.uniform(0.0005, 0.01, N))        # Cm
+
+
+def run_benchmark():
+    _I, gl, Cm = random_parameters(N_ANALYTIC)
+
+    # spike counts only (max_spikes=0), then all spike times of a subset,
+    # whose padded array grows with the largest count
+    start = timer.perf_counter()
+    count, _ = LIF_spike_times(_I, gl, Cm, max_spikes=0)
+    analytic = timer.perf_counter() - start
+    print("closed form: {:d} spike counts in {:.3f} s ({:.3g} us each)".format(
+        N_ANALYTIC, analytic, analytic / N_ANALYTIC * 1e6))
+
+    start = timer.perf_counter()
+    _, spike_times = LIF_spike_times(_I[:N_ANALYTIC // 10], gl[:N_ANALYTIC // 10],
+                                     Cm[:N_ANALYTIC // 10])
+    print("             spike times of {:d} in {:.3f} s, up to {} spikes".format(
+        N_ANALYTIC // 10, timer.perf_counter() - start, spike_times.shape[1]))
+
+    start = timer.perf_counter()
+    traces = LIF_trace(_I[:1000], gl[:1000], Cm[:1000])
+    print("traces:      {} in {:.3f} s".format(traces.shape, timer.perf_counter() - start))
+
+    start = timer.perf_counter()
+    euler_counts = np.array([len(LIF(_I[k], gl[k], Cm[k], return_spikes=True)[1])
+                             for k in range(N_LOOP)])
+    loop = (timer.perf_counter() - start) / N_LOOP
+    print("Euler loop:  {:.3g} us each, {:.0f}x slower, "
+          "spike count differs in {} of {}".format(loop * 1e6, loop / (analytic / N_ANALYTIC),
+                                                    np.sum(euler_counts != count[:N_LOOP]), N_LOOP))
+
+    deviation = 0.
+    for k in range(N_LOOP):
+        exact = LIF_adaptive(_I[k], gl[k], Cm[k], return_spikes=True)[2]
+        if len(exact) != count[k]:
+            print("spike count mismatch with the exact integrator at", k)
+            return
+        deviation = max(deviation, np.max(np.abs(exact - spike_times[k, :count[k]]), initial=0.))
+    print("max |spike time - exact integrator|: {:.3g} s".format(deviation))
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
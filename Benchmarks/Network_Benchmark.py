@@ -0,0 +1,57 @@
+__author__ = "Devrim Celik"
+
+"""
+Simulated seconds per wall-clock second of the sparse network simulator for
+Izhikevich and LIF networks, against the number of neurons N and the
+connection density (synapses per neuron / N).
+
+Run with: python -m Benchmarks.Network_Benchmark
+"""
+
+import time as timer
+
+import numpy as np
+
+from Models.Network import Network, TIME_STEPS, izhikevich_2003_network, random_weights
+
+SIZES       =   (1000, 10000, 100000)
+SYNAPSES    =   (50, 200)               # per neuron
+DURATION    =   {"Izhikevich": 200, "LIF": 0.02}  # simulated per run, model time unit
+
+#==============================================================================#
+
+def LIF_network(N, synapses, seed=0):
+    # 80% excitatory, 20% inhibitory neurons around the rheobase (0.0024 A)
+    # with a noisy input current, starting from random potentials
+    rng = np.random.default_rng(seed)
+    exc = np.arange(N) < int(0.8 * N)
+    weights = random_weights(N, synapses, weight=np.where(exc, 0.2, -0.8) / synapses * 10,
+                             seed=rng)
+    net = Network("LIF", weights, delays=0.001, I_ext=rng.uniform(0.002, 0.004, N),
+                  noise=0.002, seed=rng)
+    net.V[:] = rng.uniform(-0.065, -0.050, N)
+    return net
+
+
+def run_benchmark():
+    builders = {"Izhikevich": izhikevich_2003_network, "LIF": LIF_network}
+    print("{:<11} {:>7} {:>9} {:>10} {:>9} {:>12}".format(
+        "model", "N", "synapses", "density", "rate", "sim-s/wall-s"))
+    for model, build in builders.items():
+        seconds = TIME_STEPS[model][1]
+        for N in SIZES:
+            for synapses in SYNAPSES:
+                net = build(N, synapses, seed=0)
+                net.run(DURATION[model] / 4)            # skip the initial transient
+                start = timer.perf_counter()
+                spike_times, _ = net.run(DURATION[model])
+                wall = timer.perf_counter() - start
+                simulated = DURATION[model] * seconds
+                print("{:<11} {:>7d} {:>9d} {:>10.2g} {:>7.1f}Hz {:>12.4f}".format(
+                    model, N, synapses, synapses / N, len(spike_times) / N / simulated,
+                    simulated / wall))
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
@@ -0,0 +1,58 @@
+__author__ = "Devrim Celik"
+
+"""
+Scaling of the shared-memory population executor from one worker process to
+all cores, against the in-process run (workers=0) of the same vectorized
+update. Every population is checked to produce the same spike counts as the
+in-process run.
+
+Run with: python -m Benchmarks.Population_Benchmark
+"""
+
+import os
+import time as timer
+
+import numpy as np
+
+from Models.Population_Executor import PopulationExecutor
+
+N           =   10**6                   # neurons per population
+STEPS       =   200                     # time steps per run
+POPULATIONS = {
+    "Izhikevich":       np.linspace(0, 20, N),
+    "LIF":              np.linspace(0, 0.03, N),
+    "FitzHugh_Nagumo":  np.linspace(0, 1.5, N),
+}
+
+#==============================================================================#
+
+def time_run(model, _I, workers, sync_every):
+    with PopulationExecutor(model, _I=_I, workers=workers, sync_every=sync_every) as pop:
+        # start inside the stimulus window, so that neurons spike
+        pop.steps = int(round({"Izhikevich": 100, "LIF": 0.020,
+                               "FitzHugh_Nagumo": 50}[model] / pop.dt))
+        start = timer.perf_counter()
+        pop.run(STEPS * pop.dt)
+        seconds = timer.perf_counter() - start
+        return seconds, pop.spike_counts.copy()
+
+
+def run_benchmark(sync_every=(1, 20)):
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, 16, 32, 64, cores} & set(range(1, cores + 1)))
+    print("{} neurons, {} steps, {} cores".format(N, STEPS, cores))
+    for model, _I in POPULATIONS.items():
+        serial, reference = time_run(model, _I, 0, 1)
+        print("{:<16} in-process: {:8.3f} s".format(model, serial))
+        for every in sync_every:
+            for workers in counts:
+                seconds, spikes = time_run(model, _I, workers, every)
+                print("  {:>3d} workers, barrier every {:>3d} steps: {:8.3f} s  "
+                      "speedup {:5.2f}  {}".format(
+                          workers, every, seconds, serial / seconds,
+                          "ok" if np.array_equal(spikes, reference) else "MISMATCH"))
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
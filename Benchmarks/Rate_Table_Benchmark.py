@@ -0,0 +1,100 @@
+__author__ = "Devrim Celik"
+
+"""
+Gating rate tables (RateTable) against evaluating the six Hodgkin-Huxley rate
+functions directly with np.exp: the cost of building a table, the largest
+relative rate error per resolution, and the wall time of a single cell
+(odeint and Rush-Larsen, with the spike time error) and of a population of
+cells stepped as one array (Rush-Larsen with tabulated steady states and
+decay factors).
+
+Run with: python -m Benchmarks.Rate_Table_Benchmark
+"""
+
+import inspect
+import time as timer
+
+import numpy as np
+
+from Models.Hodgkin_Huxley_Interactive import (HH, HH_gates, RateTable, safe_rates,
+                                               get_rate_table, rush_larsen_step)
+
+RESOLUTIONS =   (1.0, 0.1, 0.05, 0.01)      # [mV]
+N           =   10**5                       # cells of the population run
+STEPS       =   200                         # steps of the population run
+# conductances and reversal potentials of the population, the defaults of HH()
+PARAMS      =   tuple(inspect.signature(HH).parameters[name].default
+                      for name in ("g_Na", "g_K", "g_Leak", "E_Na", "E_K", "E_Leak"))
+
+#==============================================================================#
+
+def time_call(func, repeats=3):
+    func()                                  # warm-up (builds the table)
+    start = timer.perf_counter()
+    for _ in range(repeats):
+        out = func()
+    return (timer.perf_counter() - start) / repeats, out
+
+
+def spike_error(spikes, reference):
+    if len(spikes) != len(reference):
+        return "{:+d} spikes".format(len(spikes) - len(reference))
+    return "{:.2g} ms".format(np.max(np.abs(spikes - reference)))
+
+
+def table_benchmark():
+    V = np.linspace(-100, 60, 10**5 + 1)
+    direct = np.array(safe_rates(V))
+    print("{:<12} {:>10} {:>16}".format("resolution", "build [ms]", "max rel. error"))
+    for step in RESOLUTIONS:
+        start = timer.perf_counter()
+        table = RateTable(step)
+        build = timer.perf_counter() - start
+        error = np.max(np.abs(np.array(table(V)) - direct) / np.abs(direct))
+        print("{:<12} {:>10.2f} {:>16.3g}".format("{:g} mV".format(step), build * 1e3, error))
+
+
+def single_cell_benchmark(_I=10):
+    print("\nsingle cell, _I = {}".format(_I))
+    for solver in ("odeint", "rush_larsen"):
+        seconds, out = time_call(lambda: HH(_I, solver=solver, return_spikes=True))
+        reference = out[-1]
+        print("  {:<12} {:<10} {:9.1f} ms".format(solver, "direct", seconds * 1e3))
+        for step in RESOLUTIONS:
+            seconds, out = time_call(
+                lambda: HH(_I, solver=solver, return_spikes=True, rate_table=step))
+            print("  {:<12} {:<10} {:9.1f} ms   spike error: {}".format(
+                solver, "{:g} mV".format(step), seconds * 1e3,
+                spike_error(out[-1], reference)))
+
+
+def population_run(gates, _I, dt=0.025):
+    # Rush-Larsen steps of N cells at once, with the step of rush_larsen()
+    V = np.full(len(_I), -65.)
+    m, h, n = np.full(len(_I), 0.05), np.full(len(_I), 0.6), np.full(len(_I), 0.32)
+    for _ in range(STEPS):
+        V, m, h, n = rush_larsen_step(V, m, h, n, _I, dt, *PARAMS, gates)
+    return V
+
+
+def population_benchmark():
+    print("\npopulation, {} cells, {} steps".format(N, STEPS))
+    _I = np.linspace(0, 20, N)
+    seconds, reference = time_call(lambda: population_run(HH_gates, _I), repeats=1)
+    print("  {:<10} {:9.3f} s".format("direct", seconds))
+    for step in RESOLUTIONS:
+        table = get_rate_table(step)
+        seconds, V = time_call(lambda: population_run(table.gates, _I), repeats=1)
+        print("  {:<10} {:9.3f} s   max |dV|: {:.2g} mV".format(
+            "{:g} mV".format(step), seconds, np.max(np.abs(V - reference))))
+
+
+def run_benchmark():
+    table_benchmark()
+    single_cell_benchmark()
+    population_benchmark()
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
@@ -0,0 +1,79 @@
+__author__ = "Devrim Celik"
+
+"""
+Measures the startup latency of the simulator, each in a fresh interpreter:
+the time from launching Model_Simulator.py until the selector window is shown,
+and per model the time from pressing its button until the first plot is
+drawn (model import, initial simulation and figure setup).
+
+Run with: python -m Benchmarks.Startup_Benchmark
+"""
+
+import subprocess
+import sys
+import time as timer
+
+#==============================================================================#
+
+MODELS = [
+    ("LIF",             "Models.LIF_Interactive",               "start_LIF_sim"),
+    ("Hodgkin-Huxley",  "Models.Hodgkin_Huxley_Interactive",    "start_HH_sim"),
+    ("Izhikevich",      "Models.Izhikevich_Interactive",        "start_IZ_sim"),
+    ("FitzHugh-Nagumo", "Models.FitzHugh_Nagumo_Interactive",   "start_FN_sim"),
+]
+
+# child processes report time.time() at the end of the measured section, the
+# parent subtracts its own time.time() from before the launch
+WINDOW_SCRIPT = """
+import Model_Simulator
+root = Model_Simulator.build_selector()
+root.update()
+import sys, time
+print(time.time())
+loaded = [name for name in ("matplotlib.pyplot", "scipy.integrate") if name in sys.modules]
+print(",".join(loaded))
+root.destroy()
+"""
+
+FIRST_PLOT_SCRIPT = """
+import time
+start = time.time()
+import matplotlib
+matplotlib.use("Agg")
+import Model_Simulator
+Model_Simulator.start_model({module!r}, {function!r})
+import matplotlib.pyplot as plt
+plt.gcf().canvas.draw()
+print(time.time() - start)
+"""
+
+
+def run_child(script):
+    return subprocess.run([sys.executable, "-c", script], capture_output=True,
+                          text=True, check=True).stdout.split("\n")
+
+
+def run_benchmark(repeats=3):
+    window = []
+    for _ in range(repeats):
+        launched = timer.time()
+        try:
+            output = run_child(WINDOW_SCRIPT)
+        except subprocess.CalledProcessError as error:
+            print("Selector window could not be opened (no display?):")
+            print(error.stderr.strip().split("\n")[-1])
+            break
+        window.append(float(output[0]) - launched)
+    if window:
+        print("{:<28} {:8.1f} ms   (eagerly loaded: {})".format(
+            "cold start to window", 1e3 * min(window), output[1] or "nothing"))
+
+    for name, module, function in MODELS:
+        latencies = [float(run_child(FIRST_PLOT_SCRIPT.format(
+            module=module, function=function))[0]) for _ in range(repeats)]
+        print("{:<28} {:8.1f} ms".format("first plot " + name, 1e3 * min(latencies)))
+
+#==============================================================================#
+
+if (__name__ == '__main__'):
+    run_benchmark()
@@ -0,0 +1,235 @@
+__author__ = "Devrim Celik"
+
+"""
+Precomputed f-I tables: firing rates of a model over a grid of stimulus
+currents and model parameters, computed once with the regular engines and
+stored on disk. Queries interpolate the table multilinearly, so they take
+microseconds instead of a full simulation. Per parameter set the table also
+holds the rheobase (refined by bisection) and the firing state of every grid
+point, from which transitions to bursting or depolarization block are read.
+
+Example:
+    python FI_Table.py HH hh_fi.npz --param _I=0:40:41 --param g_K=20:50:7
+"""
+
+import argparse
+import importlib
+import itertools
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Parameter_Sweep import MODELS, build_grid
+from Models.Spike_Features import burst_isi_threshold, detect_bursts, spike_features
+
+#==============================================================================#
+
+# seconds per time unit of every model; the stimulus window is the span of
+# the PROTOCOL of the model's module
+TIME_UNITS = {
+    "LIF":              1.,
+    "HH":               1e-3,
+    "Izhikevich":       1e-3,
+    "FitzHugh_Nagumo":  1e-3,
+}
+
+STATES = ("quiescent", "tonic", "bursting", "onset", "block")
+QUIESCENT, TONIC, BURSTING, ONSET, BLOCK = range(len(STATES))
+
+
+def measure(model, params):
+    # firing rate [Hz] during the stimulus and the firing state of one run
+    module, function, _, _, dt = MODELS[model]
+    module = importlib.import_module(module)
+    t_on, t_off = module.PROTOCOL.span()
+    seconds = TIME_UNITS[model]
+    func = getattr(module, function)
+    *traces, spike_times = func(*params, return_spikes=True)
+    V = traces[0]
+
+    spike_times = spike_times[(spike_times >= t_on) & (spike_times < t_off)]
+    features = spike_features(spike_times, t_off - t_on)
+    rate = features["rate"] / seconds
+    if features["n_spikes"] == 0:
+        return rate, QUIESCENT
+
+    # spiking stopped during the second half of the stimulus: depolarization
+    # block if V stays far above rest, otherwise only onset spikes
+    late = spike_times >= (t_on + t_off) / 2
+    if not late.any():
+        i_on, i_mid, i_off = (int(round(t / dt)) for t in (t_on, (t_on + t_off) / 2, t_off))
+        rest = V[i_on - 1]
+        late_mean = V[i_mid:i_off].mean()
+        return rate, BLOCK if late_mean - rest > 0.1 * (V.max() - rest) else ONSET
+    # bursting needs repeated bursts once onset adaptation is over: ISIs of
+    # the second half split into short intra- and long inter-burst ones
+    late_spikes = spike_times[late]
+    bursts = detect_bursts(late_spikes, burst_isi_threshold(late_spikes))
+    return rate, BURSTING if len(bursts) >= 2 else TONIC
+
+
+def _measure_rate(args):
+    return measure(*args)[0]
+
+
+def _measure(args):
+    return measure(*args)
+
+
+class FITable:
+
+    def __init__(self, model, names, axes, rates, states, rheobase):
+        self.model      =   model
+        self.names      =   list(names)         # parameter names, incl. "_I"
+        self.axes       =   [np.asarray(axis, dtype=float) for axis in axes]
+        self.rates      =   np.asarray(rates)   # [Hz], one entry per grid point
+        self.states     =   np.asarray(states)  # index into STATES
+        self.rheobase   =   np.asarray(rheobase)    # over all axes but "_I"
+        self._I         =   self.names.index("_I")
+        # interpolation only runs over axes with more than one grid value
+        self._free      =   [k for k, axis in enumerate(self.axes) if len(axis) > 1]
+        self._free_rheo =   [k for k in self._free if k != self._I]
+        self._rates     =   self.rates.reshape([len(self.axes[k]) for k in self._free])
+        self._rheobase  =   self.rheobase.reshape([len(self.axes[k]) for k in self._free_rheo])
+        self._axes      =   [axis.tolist() for axis in self.axes]
+
+    ######### Storage
+    def save(self, path):
+        np.savez(path, model=self.model, names=np.array(self.names),
+                 rates=self.rates, states=self.states, rheobase=self.rheobase,
+                 **{"axis_" + name: axis for name, axis in zip(self.names, self.axes)})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            names = [str(name) for name in data["names"]]
+            return cls(str(data["model"]), names, [data["axis_" + name] for name in names],
+                       data["rates"], data["states"], data["rheobase"])
+
+    ######### Queries
+    def _locate(self, axes, values):
+        # lower grid index and interpolation weight on every axis
+        cell = []
+        for axis, value in zip(axes, values):
+            if len(axis) == 1:
+                cell.append((0, 0.))
+                continue
+            i = min(max(bisect_right(axis, value) - 1, 0), len(axis) - 2)
+            weight = (value - axis[i]) / (axis[i + 1] - axis[i])
+            cell.append((i, min(max(weight, 0.), 1.)))
+        return cell
+
+    def _interpolate(self, table, free, params):
+        # missing parameters fall back to the first grid value
+        axes = [self._axes[k] for k in free]
+        values = [params.get(self.names[k], self._axes[k][0]) for k in free]
+        cell = self._locate(axes, values)
+        result = 0.
+        for corner in itertools.product((0, 1), repeat=len(cell)):
+            weight = 1.
+            index = []
+            for (i, w), upper in zip(cell, corner):
+                if upper and w == 0.:
+                    break
+                weight *= w if upper else 1. - w
+                index.append(i + upper)
+            else:
+                result += weight * table[tuple(index)]
+        return result
+
+    def rate(self, **params):
+        # firing rate [Hz] for e.g. rate(_I=10, g_K=30)
+        return self._interpolate(self._rates, self._free, params)
+
+    def rheobase_at(self, **params):
+        return self._interpolate(self._rheobase, self._free_rheo, params)
+
+    def state_curve(self, **params):
+        # firing states along the current axis at the nearest grid parameters
+        index = [int(np.abs(axis - params.get(name, axis[0])).argmin())
+                 for name, axis in zip(self.names, self.axes)]
+        index[self._I] = slice(None)
+        return self.states[tuple(index)]
+
+    def transitions(self, **params):
+        # (I below, I above, state below, state above) for every change of
+        # the firing state along the current axis
+        states = self.state_curve(**params)
+        currents = self.axes[self._I]
+        changes = np.nonzero(states[1:] != states[:-1])[0]
+        return [(currents[k], currents[k + 1], STATES[states[k]], STATES[states[k + 1]])
+                for k in changes]
+
+
+def build_fi_table(model, param_specs, workers=None, bisection_steps=10, verbose=True):
+    names, axes = build_grid(model, param_specs)
+    if "_I" not in names:
+        raise ValueError("{} has no stimulus current".format(model))
+    i_axis = names.index("_I")
+    shape = [len(axis) for axis in axes]
+    points = list(itertools.product(*axes))
+    if verbose:
+        print("{}: {} grid points".format(model, len(points)))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(points) // (8 * (workers or os.cpu_count() or 1)))
+        results = list(executor.map(_measure, [(model, params) for params in points],
+                                    chunksize=chunksize))
+        rates = np.array([rate for rate, _ in results]).reshape(shape)
+        states = np.array([state for _, state in results], dtype=np.int8).reshape(shape)
+
+        # rheobase: bisect between the last silent and the first firing
+        # current of every parameter set, all sets in parallel
+        other_shape = shape[:i_axis] + shape[i_axis + 1:]
+        rheobase = np.full(other_shape, np.nan)
+        brackets = {}
+        for index in itertools.product(*(range(n) for n in other_shape)):
+            curve = rates[index[:i_axis] + (slice(None),) + index[i_axis:]]
+            firing = np.nonzero(curve > 0)[0]
+            if len(firing) == 0:
+                continue
+            k = firing[0]
+            if k == 0:
+                rheobase[index] = axes[i_axis][0]
+            else:
+                brackets[index] = [axes[i_axis][k - 1], axes[i_axis][k]]
+
+        def params_at(index, current):
+            values = [axis[i] for axis, i in zip(axes[:i_axis] + axes[i_axis + 1:], index)]
+            return tuple(values[:i_axis] + [current] + values[i_axis:])
+
+        keys = list(brackets)
+        for _ in range(bisection_steps if keys else 0):
+            middles = [sum(brackets[index]) / 2 for index in keys]
+            fired = executor.map(_measure_rate, [(model, params_at(index, middle))
+                                                 for index, middle in zip(keys, middles)])
+            for index, middle, rate in zip(keys, middles, fired):
+                brackets[index][1 if rate > 0 else 0] = middle
+        for index in keys:
+            rheobase[index] = brackets[index][1]
+
+    return FITable(model, names, axes, rates, states, rheobase)
+
+#==============================================================================#
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute an f-I table of a neuron model.")
+    parser.add_argument("model", choices=sorted(TIME_UNITS))
+    parser.add_argument("path", help="output .npz file")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUES",
+                        help="grid as start:stop:num or v1,v2,...; include _I for the currents")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--bisection-steps", type=int, default=10,
+                        help="refinement steps of the rheobase")
+    args = parser.parse_args(argv)
+
+    table = build_fi_table(args.model, args.param, workers=args.workers,
+                           bisection_steps=args.bisection_steps)
+    table.save(args.path)
+    print("rheobase at the first grid point: {:.4g}".format(table.rheobase.flat[0]))
+
+
+if (__name__ == "__main__"):
+    main()
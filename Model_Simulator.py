@@ -1,5 +1,6 @@
 __author__ = "Devrim Celik"
 
+import importlib
 import tkinter as tk
 
 from sys import platform as sys_pf
@@ -7,12 +8,14 @@ if sys_pf == 'darwin':
     import matplotlib
     matplotlib.use("TkAgg")
 
-from Models.LIF_Interactive import start_LIF_sim
-from Models.Hodgkin_Huxley_Interactive import start_HH_sim
-from Models.Izhikevich_Interactive import start_IZ_sim
-from Models.FitzHugh_Nagumo_Interactive import start_FN_sim
+# the models (and with them matplotlib and scipy) are only imported once their
+# button is pressed, so the selector window appears right away
+def start_model(module_name, start_function):
+    module = importlib.import_module(module_name)
+    getattr(module, start_function)()
 
-if (__name__ == "__main__"):
+
+def build_selector():
     ####### Initialize root
     root = tk.Tk()
     root.title("Neuron Model Selector")
@@ -33,16 +36,16 @@ if (__name__ == "__main__"):
 
     ####### Button events --> corresponds to displaying Model
     def LIF_clicked():  # Leaky Integrate and Fire
-        start_LIF_sim()
+        start_model("Models.LIF_Interactive", "start_LIF_sim")
 
     def HH_clicked():  # Hodgkin-Huxely
-        start_HH_sim()
+        start_model("Models.Hodgkin_Huxley_Interactive", "start_HH_sim")
 
     def IZ_clicked():  # Izhikevich
-        start_IZ_sim()
+        start_model("Models.Izhikevich_Interactive", "start_IZ_sim")
 
     def FN_clicked():  # FitzHugh-Nagumo
-        start_FN_sim()
+        start_model("Models.FitzHugh_Nagumo_Interactive", "start_FN_sim")
 
     def close_window(root=root):  # close window button
         root.destroy()
@@ -66,11 +69,11 @@ if (__name__ == "__main__"):
     HH_btn.pack()
 
     IZ_btn = tk.Button(
-        root, 
-	text="Izhikevich Model", 
-	command=IZ_clicked, 
-	height=1, 
-	width=30)
+        root,
+        text="Izhikevich Model",
+        command=IZ_clicked,
+        height=1,
+        width=30)
     IZ_btn.pack()
 
     FN_btn = tk.Button(
@@ -82,12 +85,17 @@ if (__name__ == "__main__"):
     FN_btn.pack()
 
     EXIT_btn = tk.Button(
-        root, 
-	text="Exit", 
-	command=close_window, 
-	height=1, 
-	width=15)
+        root,
+        text="Exit",
+        command=close_window,
+        height=1,
+        width=15)
     EXIT_btn.pack()
 
+    return root
+
+
+if (__name__ == "__main__"):
     ######## start root
+    root = build_selector()
     root.mainloop()
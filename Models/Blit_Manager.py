@@ -0,0 +1,66 @@
+__author__ = "Devrim Celik"
+
+"""
+Partial redraw of the interactive plots: the static parts of a figure (axes,
+ticks, legends, slider tracks) are cached as a background image, and on an
+update only the changed lines and slider knobs are drawn on top of it
+"""
+
+import time as timer
+
+#==============================================================================#
+
+
+class BlitManager:
+
+    def __init__(self, fig, artists=(), sliders=()):
+        self.fig            =   fig
+        self.canvas         =   fig.canvas
+        self.redraws        =   0           # number of blitted redraws
+        self.last_draw_time =   0.          # [s] of the latest redraw
+        self.total_draw_time=   0.          # [s] of all redraws
+        self._background    =   None
+        self._artists       =   []
+        for artist in artists:
+            self.add_artist(artist)
+        for slider in sliders:
+            self.add_slider(slider)
+        # a full draw (first show, resize, ...) refreshes the background
+        self._cid = self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self._artists.append(artist)
+
+    def add_slider(self, slider):
+        # the knob and value label of a slider move, its track does not; the
+        # slider itself no longer triggers a full canvas draw. The knob is
+        # private in matplotlib and skipped where it does not exist
+        for artist in (slider.poly, getattr(slider, "_handle", None), slider.valtext):
+            if artist is not None:
+                self.add_artist(artist)
+        slider.drawon = False
+
+    def _on_draw(self, event):
+        if event is not None and event.canvas is not self.canvas:
+            return
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self._artists:
+            self.fig.draw_artist(artist)
+
+    def update(self):
+        # redraw all managed artists at once, call once per batch of changes
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        start = timer.perf_counter()
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+        self.last_draw_time = timer.perf_counter() - start
+        self.total_draw_time += self.last_draw_time
+        self.redraws += 1
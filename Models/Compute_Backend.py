@@ -0,0 +1,179 @@
+__author__ = "Devrim Celik"
+
+"""
+Background compute backend for the interactive plots: simulations run in a
+thread (or process) pool, and the figure only swaps in the new data once a
+result arrives. Outdated jobs are cancelled, and idle workers precompute the
+parameters the user is most likely to visit next.
+"""
+
+import os
+import time as timer
+import warnings
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from matplotlib.backend_bases import TimerBase
+
+from Models.Result_Cache import SIMULATION_CACHE
+
+#==============================================================================#
+
+POLL_INTERVAL = 10                          # [ms] between checks for results
+
+
+def timed_call(func, *args, **kwargs):
+    # runs in the worker, so the simulation time excludes queueing and drawing
+    start = timer.perf_counter()
+    result = func(*args, **kwargs)
+    return result, timer.perf_counter() - start
+
+
+class ComputeBackend:
+
+    def __init__(self, max_workers=None, kind="thread", cache=SIMULATION_CACHE):
+        if kind not in ("thread", "process"):
+            raise ValueError("Unknown backend kind '{}', use 'thread' or 'process'".format(kind))
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache
+        executor = ThreadPoolExecutor if kind == "thread" else ProcessPoolExecutor
+        self.executor = executor(max_workers=self.max_workers)
+
+    def channel(self, fig, speculate=True, redraw=None, profiler=None):
+        return ComputeChannel(self, fig, speculate=speculate, redraw=redraw,
+                              profiler=profiler)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ComputeChannel:
+    # one channel per figure: only the latest submitted job gets displayed
+
+    def __init__(self, backend, fig, speculate=True, redraw=None, profiler=None):
+        self.backend        =   backend
+        self.cache          =   backend.cache
+        self.fig            =   fig
+        self.redraw         =   redraw or fig.canvas.draw_idle
+        self.speculate      =   speculate   # precompute the next drag step
+        self.profiler       =   profiler    # UpdateProfiler, told about every result
+        self.cancelled      =   0           # outdated jobs that were dropped
+        self.failed         =   0           # requested jobs that raised
+        self.last_compute_time  =   0.      # [s] of the latest simulation
+        self.total_compute_time =   0.      # [s] of all displayed simulations
+        self.last_cached    =   False       # the latest result came from the cache
+        self._job           =   None        # (future, key, func, args, kwargs, callback)
+        self._speculative   =   {}          # key -> future
+        self._last_args     =   None
+        self._timer         =   fig.canvas.new_timer(interval=POLL_INTERVAL)
+        self._timer.add_callback(self._poll)
+        # without an event loop (e.g. Agg) results are computed right away
+        self._synchronous   =   type(self._timer) is TimerBase
+
+    def submit(self, func, args, callback, kwargs=None):
+        # compute func(*args, **kwargs) in the background and call
+        # callback(result, args) on the GUI thread, unless a newer job was
+        # submitted in the meantime
+        args = tuple(args)
+        kwargs = kwargs or {}
+        if self._synchronous:
+            hits = self.cache.hits
+            start = timer.perf_counter()
+            result = self.cache.lookup(func, *args, **kwargs)
+            self._record_compute_time(timer.perf_counter() - start, args,
+                                      cached=self.cache.hits > hits)
+            callback(result, args)
+            return
+
+        key = self.cache.key(func, args, kwargs)
+        self._cancel_job()
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.hits += 1
+            self._record_compute_time(0., args, cached=True)
+            callback(result, args)
+            self._precompute(func, args, kwargs)
+            return
+
+        self.cache.misses += 1
+        # a speculative job for these parameters is already running, adopt it
+        future = self._speculative.pop(key, None)
+        if future is None:
+            future = self.backend.executor.submit(timed_call, func, *key[1], **dict(key[2]))
+        self._job = (future, key, func, args, kwargs, callback)
+        self._timer.start()
+
+    def _record_compute_time(self, compute_time, args, cached=False):
+        self.last_compute_time = compute_time
+        self.total_compute_time += compute_time
+        self.last_cached = cached
+        if self.profiler is not None:
+            self.profiler.begin(args, compute_time, cached)
+
+    def _cancel_job(self):
+        if self._job is not None:
+            future = self._job[0]
+            # running jobs can not be interrupted, their result is cached
+            # but not displayed
+            if future.cancel() or not future.done():
+                self.cancelled += 1
+            if not future.cancelled():
+                self._speculative[self._job[1]] = future
+            self._job = None
+
+    def _precompute(self, func, args, kwargs):
+        # extrapolate the last slider movement and simulate the next step on
+        # a spare worker
+        previous, self._last_args = self._last_args, args
+        if not self.speculate or previous is None or len(previous) != len(args):
+            return
+        if len(self._speculative) >= self.backend.max_workers - 1:
+            return
+        next_args = tuple(2 * new - old if new != old else new
+                          for old, new in zip(previous, args))
+        if next_args == args:
+            return
+        key = self.cache.key(func, next_args, kwargs)
+        if key in self.cache or key in self._speculative:
+            return
+        self._speculative[key] = self.backend.executor.submit(timed_call, func, *key[1],
+                                                              **dict(key[2]))
+        self._timer.start()
+
+    def _poll(self):
+        # store finished speculative results
+        for key, future in list(self._speculative.items()):
+            if future.done():
+                del self._speculative[key]
+                if not future.cancelled() and future.exception() is None:
+                    self.cache.put(key, future.result()[0])
+
+        # display the current job once it finished
+        if self._job is not None and self._job[0].done():
+            future, key, func, args, kwargs, callback = self._job
+            self._job = None
+            error = future.exception()
+            if error is not None:
+                # keep the previous plot and the channel alive, failed
+                # speculative jobs are dropped silently above
+                self.failed += 1
+                warnings.warn("Simulation {}{} failed: {!r}".format(
+                    getattr(func, "__name__", func), args, error), RuntimeWarning)
+            else:
+                result, compute_time = future.result()
+                self._record_compute_time(compute_time, args)
+                callback(self.cache.put(key, result), args)
+                self.redraw()
+                self._precompute(func, args, kwargs)
+
+        if self._job is None and not self._speculative:
+            self._timer.stop()
+
+
+_backend = None
+
+def get_backend():
+    # shared by all figures, created on first use
+    global _backend
+    if _backend is None:
+        _backend = ComputeBackend()
+    return _backend
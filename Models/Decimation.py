@@ -0,0 +1,80 @@
+__author__ = "Devrim Celik"
+
+"""
+Level-of-detail for plotted traces: only the visible part of a trace is sent
+to matplotlib, reduced to the minimum and maximum of every pixel column, so
+spikes survive the decimation. Zooming or panning decimates again from the
+full resolution data.
+"""
+
+import numpy as np
+
+#==============================================================================#
+
+def minmax_decimate(x, y, x_min, x_max, buckets):
+    # x has to be sorted; returns the samples of the visible range [x_min, x_max]
+    # reduced to at most 2 * buckets points (plus both end points)
+    start = max(np.searchsorted(x, x_min, side="left") - 1, 0)
+    stop = min(np.searchsorted(x, x_max, side="right") + 1, len(x))
+    n = stop - start
+    buckets = max(int(buckets), 1)
+    if n <= 2 * buckets:
+        return x[start:stop], y[start:stop]
+
+    # samples per bucket, the last (partial) bucket is handled separately
+    size = int(np.ceil(n / buckets))
+    full = (n // size) * size
+    blocks = y[start:start + full].reshape(-1, size)
+    offsets = start + np.arange(len(blocks)) * size
+    indices = [np.sort(np.stack((offsets + blocks.argmin(axis=1),
+                                 offsets + blocks.argmax(axis=1)), axis=1), axis=1).ravel()]
+    if full < n:
+        rest = y[start + full:stop]
+        indices.append(np.sort([start + full + rest.argmin(), start + full + rest.argmax()]))
+    indices = np.unique(np.concatenate([[start]] + indices + [[stop - 1]]))
+
+    return x[indices], y[indices]
+
+
+class TraceDecimator:
+
+    def __init__(self, lines=()):
+        self.points_drawn   =   0           # points handed to matplotlib
+        self._traces        =   {}          # line -> (full x, full y)
+        self._axes          =   set()
+        for line in lines:
+            self.add(line)
+
+    def add(self, line):
+        # take over the (full resolution) data the line was plotted with
+        x, y = line.get_data()
+        self._traces[line] = (np.asarray(x), np.asarray(y))
+        if line.axes not in self._axes:
+            self._axes.add(line.axes)
+            line.axes.callbacks.connect("xlim_changed", self._on_xlim_changed)
+        self._decimate(line)
+
+    def set_ydata(self, line, y):
+        self._traces[line] = (self._traces[line][0], np.asarray(y))
+        self._decimate(line)
+
+    def set_data(self, line, x, y):
+        self._traces[line] = (np.asarray(x), np.asarray(y))
+        self._decimate(line)
+
+    def refresh(self, ax=None):
+        for line in self._traces:
+            if ax is None or line.axes is ax:
+                self._decimate(line)
+
+    def _on_xlim_changed(self, ax):
+        self.refresh(ax)
+
+    def _decimate(self, line):
+        x, y = self._traces[line]
+        x_min, x_max = sorted(line.axes.get_xlim())
+        # one bucket per pixel column of the axes
+        buckets = line.axes.get_window_extent().width
+        x, y = minmax_decimate(x, y, x_min, x_max, buckets)
+        line.set_data(x, y)
+        self.points_drawn = sum(len(line.get_xdata()) for line in self._traces)
@@ -4,13 +4,26 @@ Interative plot, showcasing the FitzHugh_Nagumo Model
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import Button, Slider
+
+if not __package__:
+    import Script_Setup                 # run as a script, see Models/Script_Setup.py
+
+from Models.Kernels import get_kernel
+from Models.Result_Cache import ResultCache, SIMULATION_CACHE
+from Models.Streaming import stream_blocks, BLOCK_SIZE
+from Models.Spike_Features import threshold_crossings
+from Models.Stimulus import Protocol, Step
 
 #==============================================================================#
 
 
-def FitzHugh_Nagumo(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08):
+SPIKE_THRESHOLD = 1.0                       # upward crossing of V = spike
+
+# stimulus of unit amplitude, scaled by _I
+PROTOCOL = Protocol(Step(50, 350))
+
+
+def FitzHugh_Nagumo(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08, return_spikes=False, protocol=None):
 
     ######### Experimental Setup
     # TIME
@@ -19,8 +32,7 @@ def FitzHugh_Nagumo(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08):
     time    =       np.arange(0, T+dt, dt)    # step values
 
     # CURRENT
-    I = np.zeros(len(time))
-    I[5000:35000] = _I
+    I = I_values(_I, time, protocol)
 
     # Memory
     V = np.empty(len(time))
@@ -30,45 +42,158 @@ def FitzHugh_Nagumo(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08):
     V[0] = -0.7
     W[0] = -0.5
 
-    for i in range(1, len(time)):
-        #calculate membrane potential & resting variable
-        V[i] = V[i - 1] + (V[i - 1] - (V[i - 1]**3) / 3 - W[i - 1] + I[i]) * dt
-        W[i] = W[i - 1] + ((V[i - 1] + a - b * W[i - 1]) / tau) * dt
+    get_kernel("FitzHugh_Nagumo")(V, W, I, a, b, tau, dt)
 
+    if return_spikes:
+        return V, W, threshold_crossings(V, time, SPIKE_THRESHOLD)
     return V, W
 
 
-def I_values(_I=0.5, time=None):
-    I = np.zeros(len(time))
-    I[5000:35000] = _I
-    return I
+def FitzHugh_Nagumo_step(V, W, I, a, b, tau, dt):
+    # one Euler step of N neurons (arrays, updated in place) as in
+    # FitzHugh_Nagumo(); returns the mask of upward SPIKE_THRESHOLD crossings
+    below = V < SPIKE_THRESHOLD
+    dW = (V + a - b * W) / tau
+    V += (V - V * V * V / 3 - W + I) * dt
+    W += dW * dt
+    return below & (V >= SPIKE_THRESHOLD)
+
+def FitzHugh_Nagumo_stream(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08, T=400, dt=0.01,
+                           block_size=BLOCK_SIZE, protocol=None):
+    # yields (time, V, W) blocks, identical to FitzHugh_Nagumo() for the
+    # default T and dt
+    kernel = get_kernel("FitzHugh_Nagumo")
+    protocol = protocol or PROTOCOL
+
+    def run_block(buffers, indices):
+        V, W = buffers
+        I = _I * protocol.values(indices, dt)
+        kernel(V, W, I, a, b, tau, dt)
+
+    return stream_blocks(run_block, (-0.7, -0.5), T, dt, block_size)
+
+
+def I_values(_I=0.5, time=None, protocol=None):
+    # stimulus current on the time grid, shared by the simulation and the plot
+    return (protocol or PROTOCOL).current(_I, len(time), time[1] - time[0])
+
+
+######### Phase Plane
+# dV/dt = V - V^3/3 - W + I,  dW/dt = (V + a - b W) / tau
+
+V_RANGE     =   (-2.5, 2.5)                 # phase plane window
+W_RANGE     =   (-1.0, 2.0)
+GRID        =   21                          # vector field resolution per axis
+
+# vector fields of the interactive phase plane, the V and W components are
+# cached on their own, so a slider only recomputes the component it changes
+PHASE_PLANE_CACHE = ResultCache(max_bytes=16 * 2**20)
+
+
+def phase_grid(n=GRID):
+    n = int(n)                              # cache keys hold numbers as floats
+    return np.linspace(*V_RANGE, n), np.linspace(*W_RANGE, n)
+
+
+def V_nullcline(V, _I=0.5):
+    return V - V**3 / 3 + _I
+
+
+def W_nullcline(V, a=0.7, b=0.8):
+    return (V + a) / b
+
+
+def _V_rates(_I, n):
+    V, W = phase_grid(n)
+    return (V - V*V*V / 3)[np.newaxis, :] - W[:, np.newaxis] + _I
+
+
+def _W_rates(a, b, tau, n):
+    V, W = phase_grid(n)
+    return (V[np.newaxis, :] + a - b * W[:, np.newaxis]) / tau
+
+
+def vector_field(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08, n=GRID):
+    # (dV/dt, dW/dt) on the phase_grid(n), rows are W, columns V
+    return (PHASE_PLANE_CACHE.lookup(_V_rates, _I, n),
+            PHASE_PLANE_CACHE.lookup(_W_rates, a, b, tau, n))
+
+
+def fixed_points(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08):
+    # intersections of the nullclines, i.e. the real roots of
+    # V^3 + p V + q = 0 (Cardano), each as (V, W, eigenvalues, kind)
+    if b == 0:
+        roots = [-a]
+    else:
+        p = 3 * (1 / b - 1)
+        q = 3 * (a / b - _I)
+        D = (q / 2)**2 + (p / 3)**3
+        if D >= 0:
+            roots = [np.cbrt(-q / 2 + np.sqrt(D)) + np.cbrt(-q / 2 - np.sqrt(D))]
+        else:
+            r = 2 * np.sqrt(-p / 3)
+            phi = np.arccos(np.clip(3 * q / (p * r), -1, 1)) / 3
+            roots = sorted(r * np.cos(phi - 2 * np.pi * k / 3) for k in range(3))
+
+    points = []
+    for V in roots:
+        # Jacobian [[1 - V^2, -1], [1/tau, -b/tau]]
+        trace = 1 - V**2 - b / tau
+        det = (1 - b * (1 - V**2)) / tau
+        root = np.emath.sqrt(trace**2 / 4 - det)
+        eigenvalues = np.array([trace / 2 + root, trace / 2 - root])
+        if det < 0:
+            kind = "saddle"
+        elif trace == 0:
+            kind = "center"
+        else:
+            kind = ("stable " if trace < 0 else "unstable ") + \
+                   ("focus" if trace**2 < 4 * det else "node")
+        points.append((float(V), float(V_nullcline(V, _I)), eigenvalues, kind))
+    return points
 
 
 #==============================================================================#
 
 
 def start_FN_sim():
+    # GUI dependencies are imported on first use, the model functions above
+    # only need NumPy
+    import matplotlib.pyplot as plt
+    from matplotlib.pyplot import Button, Slider
+
+    from Models.Update_Scheduler import UpdateScheduler
+    from Models.Compute_Backend import get_backend
+    from Models.Blit_Manager import BlitManager
+    from Models.Decimation import TraceDecimator
+    from Models.Profiler import UpdateProfiler
+
     # time parameters for plotting
     T       =       400                       # total simulation length
     dt      =       0.01                      # step size
     time    =       np.arange(0, T+dt, dt)    # step values
 
     # initial parameters
-    a       = 0.7
-    b       = 0.8
-    tau     = 1/0.08
+    a_init  = 0.7
+    b_init  = 0.8
+    tau_init= 1/0.08
     I_init  = 0.5
     # update functions for lines
-    V, W = FitzHugh_Nagumo(_I=I_init, a=a, b=b, tau=tau)
+    V, W = SIMULATION_CACHE.lookup(FitzHugh_Nagumo, I_init, a_init, b_init, tau_init)
     I = I_values(_I=I_init, time=time)
 
+    # phase plane: nullclines on a fine V grid, vector field on a coarse one
+    V_curve = np.linspace(*V_RANGE, 400)
+    V_grid, W_grid = np.meshgrid(*phase_grid())
+    stride = 10                             # trajectory samples per drawn point
+
     ######### Plotting
     axis_color = 'lightgoldenrodyellow'
 
     fig = plt.figure("FitzHugh-Nagumo Neuron", figsize=(14, 7))
-    ax = fig.add_subplot(111)
+    ax = fig.add_subplot(121)
     plt.title("Interactive FitzHugh-Nagumo Neuron Simulation")
-    fig.subplots_adjust(left=0.1, bottom=0.32)
+    fig.subplots_adjust(left=0.1, bottom=0.35, wspace=0.25)
 
     # plot lines
     line = plt.plot(time, V, label="Membrane Potential")[0]
@@ -82,19 +207,95 @@ def start_FN_sim():
     plt.ylabel("Potential [V]/ Current [A]")
     plt.xlabel("Time [s]")
 
+    ######### Phase Plane
+    phase_ax = fig.add_subplot(122)
+    phase_ax.set_title("Phase Plane (during the stimulus)")
+    dV, dW = vector_field(I_init, a_init, b_init, tau_init)
+    speed = np.hypot(dV, dW) + 1e-12
+    field = phase_ax.quiver(V_grid, W_grid, dV / speed, dW / speed, color="0.7",
+                            angles="xy", pivot="mid")
+    V_null = phase_ax.plot(V_curve, V_nullcline(V_curve, I_init), label="V-nullcline")[0]
+    W_null = phase_ax.plot(V_curve, W_nullcline(V_curve, a_init, b_init),
+                           label="W-nullcline")[0]
+    trajectory = phase_ax.plot(V[::stride], W[::stride], "k", lw=0.5, label="Trajectory")[0]
+    # filled markers for stable, open ones for unstable fixed points
+    stable = phase_ax.plot([], [], "o", color="k", label="Stable Fixed Point")[0]
+    unstable = phase_ax.plot([], [], "o", mfc="w", mec="k", label="Unstable Fixed Point")[0]
+    phase_ax.set_xlim(*V_RANGE)
+    phase_ax.set_ylim(*W_RANGE)
+    phase_ax.set_xlabel("V")
+    phase_ax.set_ylabel("W")
+    phase_ax.legend(loc="upper right", fontsize="small")
+
     # define sliders (position, color, inital value, parameter, etc...)
-    I_slider_axis = plt.axes([0.1, 0.17, 0.65, 0.03], facecolor=axis_color)
+    I_slider_axis = plt.axes([0.1, 0.22, 0.65, 0.03], facecolor=axis_color)
     I_slider = Slider(I_slider_axis, '$I_{ext}$', 0.0, 1.0, valinit=I_init)
 
+    a_slider_axis = plt.axes([0.1, 0.17, 0.65, 0.03], facecolor=axis_color)
+    a_slider = Slider(a_slider_axis, '$a$', 0.0, 1.5, valinit=a_init)
+
+    b_slider_axis = plt.axes([0.1, 0.12, 0.65, 0.03], facecolor=axis_color)
+    b_slider = Slider(b_slider_axis, '$b$', 0.05, 2.0, valinit=b_init)
+
+    tau_slider_axis = plt.axes([0.1, 0.07, 0.65, 0.03], facecolor=axis_color)
+    tau_slider = Slider(tau_slider_axis, r'$\tau$', 1.0, 25.0, valinit=tau_init)
+
+    sliders = [I_slider, a_slider, b_slider, tau_slider]
+
+    # per-update stage timings, toggled with the 'i' key
+    profiler = UpdateProfiler(fig)
+
+    # only the data lines and slider knobs are redrawn on an update
+    blitter = BlitManager(fig, [line, line2, line3, field, V_null, W_null, trajectory,
+                                stable, unstable, profiler.overlay],
+                          sliders)
+    redraw = profiler.redraw(blitter.update)
+
+    # traces are decimated to the screen resolution (min/max per pixel)
+    decimator = TraceDecimator([line, line2, line3])
+
+    # simulations run in the background, lines are swapped once they finish
+    channel = get_backend().channel(fig, redraw=redraw, profiler=profiler)
+
     # update functions
+    def show(result, params):
+        V, W = result
+        with profiler.stage("stimulus"):
+            I = I_values(params[0], time=time)
+        with profiler.stage("transfer"):
+            decimator.set_ydata(line, V)
+            decimator.set_ydata(line2, W)
+            decimator.set_ydata(line3, I)
+            trajectory.set_data(V[::stride], W[::stride])
+
+    def show_phase_plane(_I, a, b, tau):
+        # nullclines, field and fixed points are cheap (cached, closed form),
+        # so they follow the sliders right away
+        dV, dW = vector_field(_I, a, b, tau)
+        speed = np.hypot(dV, dW) + 1e-12
+        field.set_UVC(dV / speed, dW / speed)
+        V_null.set_ydata(V_nullcline(V_curve, _I))
+        W_null.set_ydata(W_nullcline(V_curve, a, b))
+        points = fixed_points(_I, a, b, tau)
+        for marker, is_stable in ((stable, True), (unstable, False)):
+            marker.set_data([V for V, W, _, kind in points
+                             if kind.startswith("stable") == is_stable],
+                            [W for V, W, _, kind in points
+                             if kind.startswith("stable") == is_stable])
+
     def update(val):
-        V, W = FitzHugh_Nagumo(_I=I_slider.val)
-        line.set_ydata(V)
-        line2.set_ydata(W)
-        line3.set_ydata(I_values(I_slider.val, time=time))
+        params = tuple(slider.val for slider in sliders)
+        show_phase_plane(*params)
+        channel.submit(FitzHugh_Nagumo, params, show)
+
+    show_phase_plane(I_init, a_init, b_init, tau_init)
+
+    # coalesce slider events, at most one recompute per frame
+    scheduler = UpdateScheduler(fig, update, redraw=redraw)
 
     # update, if any slider is moved
-    I_slider.on_changed(update)
+    for slider in sliders:
+        slider.on_changed(scheduler.request)
 
     # Add a button for resetting the parameters
     reset_button_ax = plt.axes([0.8, 0.02, 0.1, 0.04])
@@ -103,7 +304,8 @@ def start_FN_sim():
 
     # event of resert button being clicked
     def reset_button_was_clicked(event):
-        I_slider.reset()
+        for slider in sliders:
+            slider.reset()
 
     reset_button.on_clicked(reset_button_was_clicked)
 
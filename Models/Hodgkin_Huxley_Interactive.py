@@ -3,13 +3,303 @@ __author__ = "Devrim Celik"
 Interative plot, showcasing the Hodgkin Huxley Neuron Dynmics
 """
 
+from threading import Lock
+
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import Button, Slider
-from scipy.integrate import odeint
+from scipy.integrate import odeint, solve_ivp
+
+if not __package__:
+    import Script_Setup                 # run as a script, see Models/Script_Setup.py
+
+from Models.Result_Cache import SIMULATION_CACHE, quantize
+from Models.Streaming import stream_blocks, BLOCK_SIZE
+from Models.Spike_Features import threshold_crossings
+from Models.Stimulus import Protocol, Step
+
+#==============================================================================#
+
+
+######### Constants
+C_m = 1.  # Membrane Capacitance
+
+######### Gating Kinetics (work on scalars as well as on arrays)
+def _vtrap(x, k, derivative=False):
+    # k * x / (1 - exp(-x/10)), with derivative=True also its derivative with
+    # respect to x; at x = 0 (m_alpha: V = -40 mV, n_alpha: V = -55 mV) they
+    # take their limits 10 * k and k / 2 instead of 0/0
+    x = np.asarray(x, dtype=float)
+    one_e = -np.expm1(-x / 10.0)            # 1 - exp(-x/10)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(x == 0, 10.0 * k, k * x / one_e)
+        if not derivative:
+            return rate
+        d_rate = k * (one_e - x * (1.0 - one_e) / 10.0) / one_e**2
+    return rate, np.where(x == 0, k / 2.0, d_rate)
+
+def m_alpha(V):     return 0.1 * (V + 40.0) / (1.0 - np.exp(-(V + 40.0) / 10.0))
+def m_beta(V):      return 4.0 * np.exp(-(V + 65.0) / 18.0)
+def h_alpha(V):     return 0.07 * np.exp(-(V + 65.0) / 20.0)
+def h_beta(V):      return 1.0 / (1.0 + np.exp(-(V+35.0) / 10.0))
+def n_alpha(V):     return 0.01 * (V + 55.0) / (1.0 - np.exp(-(V + 55.0) / 10.0))
+def n_beta(V):      return 0.125 * np.exp(-(V + 65) / 80.0)
+
+def HH_rates(V):
+    # the six rates evaluated directly
+    return m_alpha(V), m_beta(V), h_alpha(V), h_beta(V), n_alpha(V), n_beta(V)
+
+def HH_gates(V, dt, rates=HH_rates):
+    # steady states of m, h, n and their decay factors exp(-dt / tau) over a
+    # step dt, as used by the Rush-Larsen step
+    a_m, b_m, a_h, b_h, a_n, b_n = rates(V)
+    return (a_m / (a_m + b_m), a_h / (a_h + b_h), a_n / (a_n + b_n),
+            np.exp(-dt * (a_m + b_m)), np.exp(-dt * (a_h + b_h)), np.exp(-dt * (a_n + b_n)))
+
+######### Rate Tables
+RATE_TABLE_RANGE    =   (-150., 100.)     # [mV], the rates are tabulated in
+RATE_TABLE_STEP     =   0.05              # [mV], default table resolution
+
+def safe_rates(V):
+    # HH_rates(V), finite at the removable singularities of m_alpha and n_alpha
+    V = np.asarray(V, dtype=float)
+    return (_vtrap(V + 40.0, 0.1), m_beta(V), h_alpha(V), h_beta(V),
+            _vtrap(V + 55.0, 0.01), n_beta(V))
+
+
+class RateTable:
+    # the six rates (and, per dt, HH_gates) tabulated every step mV and
+    # interpolated linearly; called like HH_rates, exact outside the table
+
+    def __init__(self, step=RATE_TABLE_STEP, V_range=RATE_TABLE_RANGE):
+        V_min, V_max = V_range
+        self.size   =   int(round((V_max - V_min) / step)) + 1
+        self.step   =   float(step)
+        self.V_min  =   float(V_min)
+        self.V      =   self.V_min + self.step * np.arange(self.size)
+        self.V_max  =   float(self.V[-1])
+        self.rates  =   self._tabulate(safe_rates(self.V))
+        self._gates =   {}                  # dt -> tabulated HH_gates
+        self._last  =   (None, None)        # (dt, tables) of the latest call
+
+    def _tabulate(self, columns):
+        table = np.array(columns)                               # (6, size)
+        slope = np.diff(table, axis=1)                          # per table step
+        # plain Python rows for scalar calls (the RHS of odeint)
+        return table, slope, table[:, :-1].T.tolist(), slope.T.tolist()
+
+    def _lookup(self, tabulated, V, direct):
+        table, slope, rows, slopes = tabulated
+        if np.ndim(V) == 0:
+            x = (V - self.V_min) / self.step
+            if not 0 <= x < self.size - 1:
+                return tuple(float(value) for value in direct(V))
+            i = int(x)
+            f = x - i
+            r, s = rows[i], slopes[i]
+            return (r[0] + f * s[0], r[1] + f * s[1], r[2] + f * s[2],
+                    r[3] + f * s[3], r[4] + f * s[4], r[5] + f * s[5])
+
+        V = np.asarray(V, dtype=float)
+        x = np.clip((V - self.V_min) / self.step, 0, self.size - 1)
+        i = np.minimum(x.astype(np.intp), self.size - 2)
+        f = x - i
+        # one contiguous gather per column is faster than gathering (N, 6) rows
+        values = [np.take(column, i) + f * np.take(column_slope, i)
+                  for column, column_slope in zip(table, slope)]
+        outside = (V < self.V_min) | (V > self.V_max)
+        if outside.any():
+            for value, exact in zip(values, direct(V[outside])):
+                value[outside] = exact
+        return tuple(values)
+
+    def __call__(self, V):
+        return self._lookup(self.rates, V, safe_rates)
+
+    def gates(self, V, dt):
+        # HH_gates(V, dt), the table of a step size is built on first use
+        last_dt, tabulated = self._last
+        if dt != last_dt:
+            key = quantize(dt, 9)
+            if key not in self._gates:
+                self._gates[key] = self._tabulate(HH_gates(self.V, dt, safe_rates))
+            tabulated = self._gates[key]
+            self._last = (dt, tabulated)    # one assignment, safe across threads
+        return self._lookup(tabulated, V, lambda V: HH_gates(V, dt, safe_rates))
+
+
+_RATE_TABLES = {}                          # step -> RateTable, one per process
+_RATE_TABLE_LOCK = Lock()
+
+def get_rate_table(step=RATE_TABLE_STEP):
+    # rate table of the given resolution [mV], built on first use
+    with _RATE_TABLE_LOCK:
+        table = _RATE_TABLES.get(float(step))
+        if table is None:
+            table = _RATE_TABLES[float(step)] = RateTable(step)
+    return table
+
+SPIKE_THRESHOLD = 0.                       # upward crossing of V [mV] = spike
+
+######### Experimental Setup
+T_stim_on   =   40                        # stimulus onset [ms]
+T_stim_off  =   300                       # stimulus offset [ms]
+
+# stimulus of unit amplitude, scaled by _I
+PROTOCOL = Protocol(Step(T_stim_on, T_stim_off))
+
+def step_protocol(_I, protocol=None, dt=0.1):
+    # stimulus as breakpoints [ms] and the current applied before, between
+    # and after them (one level more than breakpoints); levels are numbers
+    # for constant segments and functions of t otherwise
+    return (protocol or PROTOCOL).segments(_I, dt)
 
 #==============================================================================#
 
+def HH_rhs(t, X, I, g_Na, g_K, g_Leak, E_Na, E_K, E_Leak, rates=HH_rates):
+    # I is the stimulus current of the segment being integrated, a constant
+    # or a function of t; rates is HH_rates or a RateTable
+    V, m, h, n = X
+    if callable(I):
+        I = I(t)
+    a_m, b_m, a_h, b_h, a_n, b_n = rates(V)
+
+    #calculate membrane potential & activation variables
+    dV = (I
+          - g_Na * m**3 * h * (V - E_Na)
+          - g_K * n**4 * (V - E_K)
+          - g_Leak * (V - E_Leak)) / C_m
+    dm = a_m * (1.0 - m) - b_m * m
+    dh = a_h * (1.0 - h) - b_h * h
+    dn = a_n * (1.0 - n) - b_n * n
+    return [dV, dm, dh, dn]
+
+
+def HH_jacobian(t, X, I, g_Na, g_K, g_Leak, E_Na, E_K, E_Leak, rates=None):
+    # always from the formulas (finite at -40 and -55 mV), a rate table only
+    # changes the RHS
+    V, m, h, n = X
+
+    # rates and their derivatives with respect to V
+    a_m, da_m = _vtrap(V + 40.0, 0.1, derivative=True)
+    a_n, da_n = _vtrap(V + 55.0, 0.01, derivative=True)
+    b_m = m_beta(V)
+    a_h = h_alpha(V)
+    b_h = h_beta(V)
+    b_n = n_beta(V)
+
+    return [[-(g_Na * m**3 * h + g_K * n**4 + g_Leak) / C_m,
+             -3 * g_Na * m**2 * h * (V - E_Na) / C_m,
+             -g_Na * m**3 * (V - E_Na) / C_m,
+             -4 * g_K * n**3 * (V - E_K) / C_m],
+            [da_m * (1.0 - m) + b_m / 18.0 * m, -(a_m + b_m), 0., 0.],
+            [-a_h / 20.0 * (1.0 - h) - b_h * (1.0 - b_h) / 10.0 * h, 0., -(a_h + b_h), 0.],
+            [da_n * (1.0 - n) + b_n / 80.0 * n, 0., 0., -(a_n + b_n)]]
+
+
+def rush_larsen_step(V, m, h, n, I, dt, g_Na, g_K, g_Leak, E_Na, E_K, E_Leak,
+                     gates=HH_gates):
+    # one step of length dt, on numbers or on arrays of cells; gates(V, dt)
+    # gives the steady states and decay factors (HH_gates or RateTable.gates)
+    # gating variables
+    m_inf, h_inf, n_inf, m_decay, h_decay, n_decay = gates(V, dt)
+    m = m_inf + (m - m_inf) * m_decay
+    h = h_inf + (h - h_inf) * h_decay
+    n = n_inf + (n - n_inf) * n_decay
+    # membrane potential
+    g_Na_m = g_Na * m**3 * h
+    g_K_n = g_K * n**4
+    G = g_Na_m + g_K_n + g_Leak
+    V_inf = (I + g_Na_m * E_Na + g_K_n * E_K + g_Leak * E_Leak) / G
+    V = V_inf + (V - V_inf) * np.exp(-dt * G / C_m)
+    return V, m, h, n
+
+def rush_larsen(rhs_args, X0, time, max_step):
+    # fixed-step exponential Euler, every output interval split into equal
+    # steps of at most max_step; X0 holds numbers or arrays of N cells
+    I, g_Na, g_K, g_Leak, E_Na, E_K, E_Leak = rhs_args[:7]
+    rates = rhs_args[7] if len(rhs_args) > 7 else HH_rates
+    gates = short_gates = HH_gates
+    if isinstance(rates, RateTable):
+        # tables are only built for the regular step max_step, the shorter
+        # steps left in front of protocol breakpoints use exact exponentials
+        gates = rates.gates
+        short_gates = lambda V, dt: HH_gates(V, dt, safe_rates)
+
+    states = np.empty((len(time), 4) + np.shape(X0[0]))
+    states[0] = V, m, h, n = X0
+    steps = 0
+    current = I if callable(I) else (lambda t, I=I: I)
+    for k in range(1, len(time)):
+        substeps = max(1, int(np.ceil((time[k] - time[k-1]) / max_step - 1e-9)))
+        dt = (time[k] - time[k-1]) / substeps
+        step_gates = gates if abs(dt - max_step) <= 1e-9 * max_step else short_gates
+        for j in range(substeps):
+            V, m, h, n = rush_larsen_step(V, m, h, n, current(time[k-1] + j * dt), dt,
+                                          g_Na, g_K, g_Leak, E_Na, E_K, E_Leak, step_gates)
+        steps += substeps
+        states[k] = V, m, h, n
+
+    return states, {"nfev": steps, "njev": 0}
+
+
+SOLVERS = ("odeint", "LSODA", "BDF", "Radau", "rush_larsen")
+TOLERANCE = 1.49012e-8                    # odeint's default rtol/atol
+BATCH_MIN_CELLS = 8                       # smaller batches run cell by cell
+
+def integrate_segment(rhs_args, X0, time, solver="odeint", max_step=0.025,
+                      tolerance=TOLERANCE):
+    # integrates from time[0] (state X0) with a constant stimulus; returns the
+    # (len(time), 4) states and a dict with RHS/Jacobian call counts. Only
+    # rush_larsen integrates N cells at once, into (len(time), 4, N) states.
+    if solver == "odeint":
+        states, info = odeint(HH_rhs, X0, time, args=rhs_args, Dfun=HH_jacobian,
+                              tfirst=True, full_output=True,
+                              rtol=tolerance, atol=tolerance)
+        return states, {"nfev": int(info["nfe"][-1]), "njev": int(info["nje"][-1])}
+    elif solver in ("LSODA", "BDF", "Radau"):
+        solution = solve_ivp(HH_rhs, (time[0], time[-1]), X0, method=solver,
+                             t_eval=time, args=rhs_args, jac=HH_jacobian,
+                             rtol=tolerance, atol=tolerance)
+        return solution.y.T, {"nfev": int(solution.nfev), "njev": int(solution.njev)}
+    elif solver == "rush_larsen":
+        return rush_larsen(rhs_args, X0, time, max_step)
+    raise ValueError("Unknown solver '{}', choose one of {}".format(solver, SOLVERS))
+
+
+def integrate_HH(params, X0, time, protocol, solver="odeint", substeps=4,
+                 tolerance=TOLERANCE, rates=HH_rates):
+    # params: (g_Na, g_K, g_Leak, E_Na, E_K, E_Leak), protocol: (breakpoints,
+    # levels), see step_protocol; the solver restarts at every breakpoint
+    breakpoints, levels = protocol
+    if len(levels) != len(breakpoints) + 1:
+        raise ValueError("A protocol needs one level more than breakpoints")
+    max_step = (time[1] - time[0]) / substeps
+
+    edges = np.concatenate(([-np.inf], breakpoints, [np.inf]))
+    states = np.empty((len(time), 4) + np.shape(X0[0]))
+    info = {"nfev": 0, "njev": 0, "segments": 0}
+    X = X0
+    for level, t_start, t_end in zip(levels, edges[:-1], edges[1:]):
+        t_start = max(t_start, time[0])
+        t_end = min(t_end, time[-1])
+        if t_end <= t_start:
+            continue
+        # output points of this segment; the final segment keeps its end point
+        inside = (time >= t_start) & ((time < t_end) | (t_end == time[-1]))
+        t_eval = np.unique(np.concatenate(([t_start], time[inside], [t_end])))
+
+        rhs_args = (level,) + tuple(params) + (rates,)
+        segment, segment_info = integrate_segment(rhs_args, X, t_eval,
+                                                  solver=solver, max_step=max_step,
+                                                  tolerance=tolerance)
+        states[inside] = segment[np.searchsorted(t_eval, time[inside])]
+        X = segment[-1]
+        info["nfev"] += segment_info["nfev"]
+        info["njev"] += segment_info["njev"]
+        info["segments"] += 1
+
+    return states, info
+
+#==============================================================================#
 
 def HH(_I=7,
        g_Na=120.,
@@ -17,63 +307,142 @@ def HH(_I=7,
        g_Leak=0.3,
        E_Na=50.,
        E_K=-77.,
-       E_Leak=-54.387):
-
-    ######### Constants
-    C_m = 1.  # Membrane Capacitance
-
-    ######### Gating Kinetics
-    m_alpha =       lambda V: 0.1 * (V + 40.0) / (1.0 - np.exp(-(V + 40.0) / 10.0))
-    m_beta  =       lambda V: 4.0 * np.exp(-(V + 65.0) / 18.0)
-    h_alpha =       lambda V: 0.07 * np.exp(-(V + 65.0) / 20.0)
-    h_beta  =       lambda V: 1.0 / (1.0 + np.exp(-(V+35.0) / 10.0))
-    n_alpha =       lambda V: 0.01 * (V + 55.0) / (1.0 - np.exp(-(V + 55.0) / 10.0))
-    n_beta  =       lambda V: 0.125 * np.exp(-(V + 65) / 80.0)
-
-    ######### Ion Currents
-    I_Na    =       lambda V, m, h:     g_Na * m**3 * h * (V - E_Na)
-    I_K     =       lambda    V, n:     g_K * n**4 * (V - E_K)
-    I_Leak  =       lambda       V:     g_Leak * (V - E_Leak)
+       E_Leak=-54.387,
+       solver="odeint",
+       protocol=None,
+       return_spikes=False,
+       rate_table=None,
+       return_info=False):
+    # rate_table: resolution [mV] of a gating rate table (see RateTable),
+    # None evaluates the rate functions directly; return_info appends the
+    # solver statistics (RHS and Jacobian calls, segments)
 
     ######### Experimental Setup
     # TIME
     T       =       400                       # total simulation length
     dt      =       0.1                       # step size
     time    =       np.arange(0, T+dt, dt)    # step values
-    # CURRENT
 
-    def I(t):
-        return _I * (40 < t < 300)
-
-    # Function to odeint over
-    def change(X, t):
-        V, m, h, n = X
-
-        #calculate membrane potential & activation variables
-        dV = (I(t) - I_Na(V, m, h) - I_K(V, n) - I_Leak(V)) / C_m
-        dm = m_alpha(V) * (1.0 -m ) - m_beta(V) * m
-        dh = h_alpha(V) * (1.0 - h) - h_beta(V) * h
-        dn = n_alpha(V) * (1.0 - n) - n_beta(V) * n
-        return dV, dm, dh, dn
+    # CURRENT (a Protocol or its (breakpoints, levels))
+    if not isinstance(protocol, tuple):
+        protocol = step_protocol(_I, protocol, dt)
 
+    # RATES
+    rates = HH_rates if rate_table is None else get_rate_table(rate_table)
 
     # integrate over all 4 differential equations, use following initial conditions
-    all_changes = odeint(change, [-65, 0.05, 0.6, 0.32], time)
+    all_changes, info = integrate_HH((g_Na, g_K, g_Leak, E_Na, E_K, E_Leak),
+                                     [-65, 0.05, 0.6, 0.32], time, protocol, solver=solver,
+                                     rates=rates)
     V = all_changes[:,0]
     m = all_changes[:,1]
     h = all_changes[:,2]
     n = all_changes[:,3]
 
+    result = (V, m, h, n)
+    if return_spikes:
+        result += (threshold_crossings(V, time, SPIKE_THRESHOLD),)
+    if return_info:
+        result += (info,)
+    return result
+
+def HH_batch(_I=7,
+             g_Na=120.,
+             g_K=36.,
+             g_Leak=0.3,
+             E_Na=50.,
+             E_K=-77.,
+             E_Leak=-54.387,
+             protocol=None,
+             substeps=4,
+             rate_table=None,
+             return_spikes=False):
+    # N cells in one Rush-Larsen run (_I and parameters as arrays of N),
+    # returned as (N, samples) arrays; batching pays off from BATCH_MIN_CELLS
+    # cells on, smaller batches run cell by cell like HH(solver="rush_larsen")
+
+    ######### Experimental Setup
+    # TIME
+    T       =       400                       # total simulation length
+    dt      =       0.1                       # step size
+    time    =       np.arange(0, T+dt, dt)    # step values
+
+    # CELLS
+    _I, *params = np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=float))
+                                        for value in (_I, g_Na, g_K, g_Leak, E_Na, E_K, E_Leak)))
+    N = len(_I)
+
+    # RATES
+    rates = HH_rates if rate_table is None else get_rate_table(rate_table)
+
+    if N < BATCH_MIN_CELLS and not isinstance(protocol, tuple):
+        # CURRENT (a Protocol, scaled by the _I of each cell)
+        all_changes = np.stack([
+            integrate_HH([float(param[k]) for param in params], [-65., 0.05, 0.6, 0.32],
+                         time, step_protocol(_I[k], protocol, dt), solver="rush_larsen",
+                         substeps=substeps, rates=rates)[0]
+            for k in range(N)], axis=-1)
+    else:
+        # CURRENT (a Protocol or its (breakpoints, levels), scaled by every _I)
+        if not isinstance(protocol, tuple):
+            protocol = step_protocol(_I, protocol, dt)
+        X0 = np.repeat([[-65.], [0.05], [0.6], [0.32]], N, axis=1)
+        all_changes, _ = integrate_HH(params, X0, time, protocol, solver="rush_larsen",
+                                      substeps=substeps, rates=rates)
+    V, m, h, n = np.moveaxis(all_changes, 0, -1)   # each (N, samples)
+
+    if return_spikes:
+        return V, m, h, n, [threshold_crossings(V_cell, time, SPIKE_THRESHOLD) for V_cell in V]
     return V, m, h, n
 
-def I_values(time=None, _I=7):
-    I = np.zeros(len(time))
-    I[400:3000] = _I
-    return I
+def HH_stream(_I=7,
+              g_Na=120.,
+              g_K=36.,
+              g_Leak=0.3,
+              E_Na=50.,
+              E_K=-77.,
+              E_Leak=-54.387,
+              protocol=None,
+              T=400,
+              dt=0.1,
+              substeps=4,
+              block_size=BLOCK_SIZE,
+              rate_table=None):
+    # yields (time, V, m, h, n) blocks. Adaptive solvers pick different steps
+    # when restarted at block boundaries, so streaming uses the fixed-step
+    # Rush-Larsen integrator; the result equals HH(solver="rush_larsen").
+    if not isinstance(protocol, tuple):
+        protocol = step_protocol(_I, protocol, dt)
+    params = (g_Na, g_K, g_Leak, E_Na, E_K, E_Leak)
+    rates = HH_rates if rate_table is None else get_rate_table(rate_table)
+
+    def run_block(buffers, indices):
+        states, _ = integrate_HH(params, [buffer[0] for buffer in buffers],
+                                 indices * dt, protocol, solver="rush_larsen",
+                                 substeps=substeps, rates=rates)
+        for buffer, state in zip(buffers, states.T):
+            buffer[1:] = state[1:]
+
+    return stream_blocks(run_block, (-65, 0.05, 0.6, 0.32), T, dt, block_size)
+
+def I_values(time=None, _I=7, protocol=None):
+    # stimulus current on the time grid, shared by the simulation and the plot
+    return (protocol or PROTOCOL).current(_I, len(time), time[1] - time[0])
 
 #==============================================================================#
 
 def start_HH_sim():
+    # GUI dependencies are imported on first use, the model functions above
+    # only need NumPy and SciPy
+    import matplotlib.pyplot as plt
+    from matplotlib.pyplot import Button, Slider
+
+    from Models.Update_Scheduler import UpdateScheduler
+    from Models.Compute_Backend import get_backend
+    from Models.Blit_Manager import BlitManager
+    from Models.Decimation import TraceDecimator
+    from Models.Profiler import UpdateProfiler
+
     T       =       400                       # total simulation length
     dt      =       0.1                       # step size
     time    =       np.arange(0, T+dt, dt)    # step values
@@ -88,7 +457,7 @@ def start_HH_sim():
 
     I_init       =       15
 
-    V, m, h, n = HH()
+    V, m, h, n, _ = SIMULATION_CACHE.lookup(HH, return_info=True)
     I = I_values(time=time)
 
     ######### Plotting
@@ -149,29 +518,53 @@ def start_HH_sim():
     ELeak_slider = Slider(
         ELeak_slider_axis, '$E_{Leak}$ ', -70, -40, valinit=E_Leak_init)
 
+    # per-update stage timings, toggled with the 'i' key
+    profiler = UpdateProfiler(fig)
+
+    # only the data lines and slider knobs are redrawn on an update
+    blitter = BlitManager(fig, [line, line2, line3, line4, line5, profiler.overlay],
+                          [I_slider, gNa_slider, gK_slider, gLeak_slider,
+                           ENa_slider, EK_slider, ELeak_slider])
+    redraw = profiler.redraw(blitter.update)
+
+    # traces are decimated to the screen resolution (min/max per pixel)
+    decimator = TraceDecimator([line, line2, line3, line4, line5])
+
+    # simulations run in the background, lines are swapped once they finish
+    channel = get_backend().channel(fig, redraw=redraw, profiler=profiler)
+
+    def show(result, params):
+        V, m, h, n, info = result
+        profiler.count(info)
+        with profiler.stage("stimulus"):
+            I = I_values(_I=params[0], time=time)
+        with profiler.stage("transfer"):
+            decimator.set_ydata(line, V)
+            decimator.set_ydata(line2, I)
+            decimator.set_ydata(line3, m)
+            decimator.set_ydata(line4, h)
+            decimator.set_ydata(line5, n)
+
     def update(val):
-        V, m, h, n = HH(
-            _I=I_slider.val,
-            g_Na=gNa_slider.val,
-            g_K=gK_slider.val,
-            g_Leak=gLeak_slider.val,
-            E_Na=ENa_slider.val,
-            E_K=EK_slider.val,
-            E_Leak=ELeak_slider.val)
-        line.set_ydata(V)
-        line2.set_ydata(I_values(_I=I_slider.val, time=time))
-        line3.set_ydata(m)
-        line4.set_ydata(h)
-        line5.set_ydata(n)
+        channel.submit(HH, (I_slider.val,
+                            gNa_slider.val,
+                            gK_slider.val,
+                            gLeak_slider.val,
+                            ENa_slider.val,
+                            EK_slider.val,
+                            ELeak_slider.val), show, kwargs={"return_info": True})
+
+    # coalesce slider events, at most one recompute per frame
+    scheduler = UpdateScheduler(fig, update, redraw=redraw)
 
     # update, if any slider is moved
-    I_slider.on_changed(update)
-    gNa_slider.on_changed(update)
-    gK_slider.on_changed(update)
-    gLeak_slider.on_changed(update)
-    ENa_slider.on_changed(update)
-    EK_slider.on_changed(update)
-    ELeak_slider.on_changed(update)
+    I_slider.on_changed(scheduler.request)
+    gNa_slider.on_changed(scheduler.request)
+    gK_slider.on_changed(scheduler.request)
+    gLeak_slider.on_changed(scheduler.request)
+    ENa_slider.on_changed(scheduler.request)
+    EK_slider.on_changed(scheduler.request)
+    ELeak_slider.on_changed(scheduler.request)
 
     # Add a button for resetting the parameters
     reset_button_ax = plt.axes([0.8, 0.02, 0.1, 0.04])
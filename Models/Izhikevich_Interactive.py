@@ -6,12 +6,22 @@ diverse neuron types it can adapt to
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import  Button, Slider
+
+if not __package__:
+    import Script_Setup                 # run as a script, see Models/Script_Setup.py
+
+from Models.Kernels import get_kernel
+from Models.Result_Cache import SIMULATION_CACHE
+from Models.Streaming import stream_blocks, BLOCK_SIZE
+from Models.Stimulus import Protocol, Step
 
 #==============================================================================#
 
-def Izhikevich_Model(_I = 10, a = 0.02, b = 0.2, c = -65, d = 8):
+# stimulus of unit amplitude, scaled by _I
+PROTOCOL = Protocol(Step(100, 750))
+
+def Izhikevich_Model(_I = 10, a = 0.02, b = 0.2, c = -65, d = 8, return_spikes = False,
+                     protocol = None):
 
     ######### Constants
     spike_value = 35                            # Maximal Spike Value
@@ -28,34 +38,149 @@ def Izhikevich_Model(_I = 10, a = 0.02, b = 0.2, c = -65, d = 8):
     u               =   np.zeros(len(time))     # array for saving Recovery history
     u[0]            =   -14
     # CURRENT
-    I = np.zeros(len(time))
-    I[200:1500] = _I
+    I = I_values(_I, time, protocol)
 
-    for t in range(1, len(time)):
-        # if we still didnt reach spike potential
-        if V[t-1] < spike_value:
-            # ODE for membrane potential
-            dV      = (0.04 * V[t-1] + 5) * V[t-1] + 140 - u[t-1]
-            V[t]    = V[t-1] + (dV + I[t-1]) * dt
-            # ODE for recovery variable
-            du      = a * (b * V[t-1] - u[t-1])
-            u[t]    = u[t-1] + dt * du
-        # spike reached!
-        else:
-            V[t-1] = spike_value    # set to spike value
-            V[t] = c                # reset membrane voltage
-            u[t] = u[t-1] + d       # reset recovery
+    # SPIKES
+    spike_index     =   np.empty(len(time), dtype=np.int64)  # sample of each spike peak
+
+    spikes = get_kernel("Izhikevich")(V, u, I, a, b, c, d, spike_value, dt, spike_index)
 
+    if return_spikes:
+        return V, time[spike_index[:spikes]]
     return V
 
-def I_values(_I=10, time=None):
-    I = np.zeros(len(time))
-    I[200:1500] = _I
-    return I
+def Izhikevich_Adaptive(_I = 10, a = 0.02, b = 0.2, c = -65, d = 8, rtol = 1e-4, atol = 1e-4,
+                        max_step = np.inf, return_spikes = False, protocol = None):
+    # error-controlled steps instead of dt = 0.5, spike times are interpolated
+    # to where V crosses spike_value. Returns the non-uniform sample times,
+    # V and u
+
+    ######### Constants
+    spike_value = 35                            # Maximal Spike Value
+    T               =   1000                    # total simulation length [ms]
+
+    ######### Current (edges [ms] and levels in between)
+    edges, levels = (protocol or PROTOCOL).segments(_I)
+    if not all(np.isscalar(level) for level in levels):
+        raise ValueError("Izhikevich_Adaptive needs a piecewise constant protocol")
+    edges, levels = np.array(edges, dtype=float), np.array(levels, dtype=float)
+
+    ######### Simulation (retry with larger outputs if they overflow)
+    capacity = 4096
+    while True:
+        time, V, u = np.empty(capacity), np.empty(capacity), np.empty(capacity)
+        spike_times = np.empty(capacity)
+        n, spikes, nfev = get_kernel("Izhikevich_adaptive")(
+            edges, levels, -70., -14., a, b, c, d, spike_value, T, rtol, atol,
+            max_step, time, V, u, spike_times)
+        if n >= 0:
+            break
+        capacity *= 4
+
+    if return_spikes:
+        return time[:n], V[:n], u[:n], spike_times[:spikes]
+    return time[:n], V[:n], u[:n]
+
+def Izhikevich_step(V, u, I, a, b, c, d, dt, spike_value=35, reset="next"):
+    # one Euler step of N neurons (arrays, updated in place); returns the mask
+    # of spiking neurons. reset="next": neurons at spike_value are reset
+    # instead of stepped, as in Izhikevich_Model(); reset="same": neurons
+    # crossing spike_value are reset in this step, as in Izhikevich (2003)
+    if reset == "next":
+        spike = V >= spike_value
+        u_reset = u[spike] + d[spike]
+    # ODE for membrane potential & recovery variable (all neurons)
+    dV      = (0.04 * V + 5) * V + 140 - u
+    du      = a * (b * V - u)
+    V      += (dV + I) * dt
+    u      += du * dt
+    # spike reached! reset only the masked neurons
+    if reset == "next":
+        V[spike] = c[spike]
+        u[spike] = u_reset
+    else:
+        spike = V >= spike_value
+        V[spike] = c[spike]
+        u[spike] += d[spike]
+    return spike
+
+def Izhikevich_Population(_I = 10, a = 0.02, b = 0.2, c = -65, d = 8, protocol = None):
+    # N neurons at once, every parameter a number or an array of N; returns
+    # the (N, T) voltages and the spike times [ms] of every neuron
+
+    ######### Parameters (broadcast to one entry per neuron)
+    _I, a, b, c, d  =   np.broadcast_arrays(*(np.atleast_1d(np.asarray(p, dtype=float))
+                                              for p in (_I, a, b, c, d)))
+    N               =   len(_I)
+
+    ######### Constants
+    spike_value = 35                            # Maximal Spike Value
+
+    ######### Experimental Setup
+    # TIME
+    T               =   1000                    # total simulation length [ms]
+    dt              =   0.5                     # step size [ms]
+    time            =   np.arange(0, T+dt, dt)  # step values [ms]
+    # VOLTAGE
+    V               =   np.zeros((N, len(time)))    # voltage history per neuron
+    V[:, 0]         =   -70                         # set initial to resting potential
+    # RECOVERY (current value only)
+    u               =   np.full(N, -14.)
+    # CURRENT (unit amplitude, scaled per neuron)
+    I = I_values(1., time, protocol)
+    # SPIKES
+    spiked          =   np.zeros((N, len(time)), dtype=bool)
+
+    V_now = V[:, 0].copy()
+    for t in range(1, len(time)):
+        spike = Izhikevich_step(V_now, u, _I * I[t-1], a, b, c, d, dt, spike_value)
+        V[:, t] = V_now
+        # the sample before a reset shows the spike
+        if spike.any():
+            V[spike, t-1]   = spike_value
+            spiked[spike, t-1] = True
+
+    neuron_idx, time_idx = np.nonzero(spiked)
+    spike_times = np.split(time[time_idx], np.cumsum(np.bincount(neuron_idx, minlength=N))[:-1])
+
+    return V, spike_times
+
+def Izhikevich_stream(_I = 10, a = 0.02, b = 0.2, c = -65, d = 8, T = 1000, dt = 0.5,
+                      block_size = BLOCK_SIZE, protocol = None):
+    # yields (time, V, u) blocks, V is identical to Izhikevich_Model() for the
+    # default T and dt
+
+    ######### Constants
+    spike_value = 35                            # Maximal Spike Value
+
+    kernel = get_kernel("Izhikevich")
+    protocol = protocol or PROTOCOL
+
+    def run_block(buffers, indices):
+        V, u = buffers
+        I = _I * protocol.values(indices, dt)
+        kernel(V, u, I, a, b, c, d, spike_value, dt, np.empty(len(V), dtype=np.int64))
+
+    return stream_blocks(run_block, (-70, -14), T, dt, block_size)
+
+def I_values(_I=10, time=None, protocol=None):
+    # stimulus current on the time grid, shared by the simulation and the plot
+    return (protocol or PROTOCOL).current(_I, len(time), time[1] - time[0])
 
 #==============================================================================#
 
 def start_IZ_sim():
+    # GUI dependencies are imported on first use, the model functions above
+    # only need NumPy
+    import matplotlib.pyplot as plt
+    from matplotlib.pyplot import Button, Slider
+
+    from Models.Update_Scheduler import UpdateScheduler
+    from Models.Compute_Backend import get_backend
+    from Models.Blit_Manager import BlitManager
+    from Models.Decimation import TraceDecimator
+    from Models.Profiler import UpdateProfiler
+
     # time parameters for plotting
     T               =   1000                    # total simulation length [ms]
     dt              =   0.5                     # step size [ms]
@@ -68,7 +193,8 @@ def start_IZ_sim():
     c_init = -65
     d_init = 8
 
-    V = Izhikevich_Model()
+    V = SIMULATION_CACHE.lookup(
+        Izhikevich_Model, I_init, a_init, b_init, c_init, d_init)
     I = I_values(time=time)
 
     ######### Plotting
@@ -106,19 +232,41 @@ def start_IZ_sim():
     d_slider_axis = plt.axes([0.1, 0.20, 0.65, 0.03], facecolor=axis_color)
     d_slider = Slider(d_slider_axis, '$d$', 0.001, 10, valinit=d_init)
 
+    # per-update stage timings, toggled with the 'i' key
+    profiler = UpdateProfiler(fig)
+
+    # only the data lines and slider knobs are redrawn on an update
+    blitter = BlitManager(fig, [line, line2, profiler.overlay],
+                          [I_slider, a_slider, b_slider, c_slider, d_slider])
+    redraw = profiler.redraw(blitter.update)
+
+    # traces are decimated to the screen resolution (min/max per pixel)
+    decimator = TraceDecimator([line, line2])
+
+    # simulations run in the background, lines are swapped once they finish
+    channel = get_backend().channel(fig, redraw=redraw, profiler=profiler)
+
     # update functions
+    def show(V, params):
+        with profiler.stage("stimulus"):
+            I = I_values(params[0], time=time)
+        with profiler.stage("transfer"):
+            decimator.set_ydata(line, V)
+            decimator.set_ydata(line2, I)
+
     def update(val):
-        line.set_ydata(
-            Izhikevich_Model(I_slider.val, a_slider.val, b_slider.val,
-                             c_slider.val, d_slider.val))
-        line2.set_ydata(I_values(I_slider.val, time=time))
+        channel.submit(Izhikevich_Model, (I_slider.val, a_slider.val, b_slider.val,
+                                          c_slider.val, d_slider.val), show)
+
+    # coalesce slider events, at most one recompute per frame
+    scheduler = UpdateScheduler(fig, update, redraw=redraw)
 
     # update, if any slider is moved
-    I_slider.on_changed(update)
-    a_slider.on_changed(update)
-    b_slider.on_changed(update)
-    c_slider.on_changed(update)
-    d_slider.on_changed(update)
+    I_slider.on_changed(scheduler.request)
+    a_slider.on_changed(scheduler.request)
+    b_slider.on_changed(scheduler.request)
+    c_slider.on_changed(scheduler.request)
+    d_slider.on_changed(scheduler.request)
 
     ########################### REGULAR SPIKING BUTTON #############################
     # Add a button for resetting the parameters
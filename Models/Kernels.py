@@ -0,0 +1,259 @@
+__author__ = "Devrim Celik"
+
+"""
+Step loops of the LIF, FitzHugh-Nagumo and Izhikevich models, compiled with
+Numba when it is installed; otherwise the plain Python loops are used. The
+spiking loops write the sample index of every spike peak into spike_index and
+return the number of spikes.
+
+The adaptive loops step over a piecewise constant current given by its edges
+(times) and levels (one more than edges). They write the non-uniform sample
+times and states into the output arrays and return the number of samples,
+or -1 if the arrays are too short.
+"""
+
+import math
+import os
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+#==============================================================================#
+
+def _LIF_loop(V, I, gl, Cm, El, thresh, dt, spike_index):
+    spikes = 0
+    for i in range(1, len(V)):
+        # use "I - V/R = C * dV/dT" to get this equation
+        dV =  (I[i] - gl*(V[i-1]-El))/Cm
+        V[i] = V[i-1] + dV*dt
+
+        # in case we exceed threshold
+        if V[i] > thresh:
+            V[i-1] = 0.04   # set the last step to spike value
+            V[i] = El       # current step is resting membrane potential
+            spike_index[spikes] = i - 1
+            spikes += 1     # count spike
+    return spikes
+
+def _FitzHugh_Nagumo_loop(V, W, I, a, b, tau, dt):
+    for i in range(1, len(V)):
+        #calculate membrane potential & resting variable
+        V[i] = V[i - 1] + (V[i - 1] - (V[i - 1]**3) / 3 - W[i - 1] + I[i]) * dt
+        W[i] = W[i - 1] + ((V[i - 1] + a - b * W[i - 1]) / tau) * dt
+
+def _Izhikevich_loop(V, u, I, a, b, c, d, spike_value, dt, spike_index):
+    spikes = 0
+    for t in range(1, len(V)):
+        # if we still didnt reach spike potential
+        if V[t-1] < spike_value:
+            # ODE for membrane potential
+            dV      = (0.04 * V[t-1] + 5) * V[t-1] + 140 - u[t-1]
+            V[t]    = V[t-1] + (dV + I[t-1]) * dt
+            # ODE for recovery variable
+            du      = a * (b * V[t-1] - u[t-1])
+            u[t]    = u[t-1] + dt * du
+        # spike reached!
+        else:
+            V[t-1] = spike_value    # set to spike value
+            V[t] = c                # reset membrane voltage
+            u[t] = u[t-1] + d       # reset recovery
+            spike_index[spikes] = t - 1
+            spikes += 1
+    return spikes
+
+#==============================================================================#
+
+def _LIF_exact_loop(edges, levels, V0, gl, Cm, El, thresh, T, max_step,
+                    t_out, V_out, spike_times):
+    # exact exponential solution for constant current, so steps only end at
+    # current edges, threshold crossings (log of the exponential) or after
+    # max_step (samples for plotting)
+    t = 0.
+    V = V0
+    t_out[0] = t
+    V_out[0] = V
+    n = 1
+    spikes = 0
+    segment = 0
+    while t < T:
+        while segment < len(edges) and edges[segment] <= t:
+            segment += 1
+        end = min(edges[segment] if segment < len(edges) else T, T, t + max_step)
+        I = levels[segment]
+
+        # time until V reaches threshold (infinite if it never does)
+        to_spike = math.inf
+        tau   = math.inf
+        V_inf = El
+        if gl > 0.:
+            tau   = Cm/gl
+            V_inf = El + I/gl
+            if V_inf > thresh:
+                to_spike = tau * math.log((V - V_inf)/(thresh - V_inf))
+        elif I > 0.:
+            to_spike = (thresh - V)*Cm/I
+
+        if n + 3 > len(t_out):
+            return -1, spikes
+        if t + to_spike <= end:
+            t += to_spike
+            # spike: threshold, peak and reset at the same time
+            t_out[n] = t
+            V_out[n] = thresh
+            t_out[n+1] = t
+            V_out[n+1] = 0.04
+            t_out[n+2] = t
+            V_out[n+2] = El
+            n += 3
+            V = El
+            spike_times[spikes] = t
+            spikes += 1
+        else:
+            if gl > 0.:
+                V = V_inf + (V - V_inf)*math.exp(-(end - t)/tau)
+            else:
+                V += I*(end - t)/Cm
+            t = end
+            t_out[n] = t
+            V_out[n] = V
+            n += 1
+    return n, spikes
+
+def _Izhikevich_adaptive_loop(edges, levels, V0, u0, a, b, c, d, spike_value, T,
+                              rtol, atol, max_step, t_out, V_out, u_out, spike_times):
+    # Bogacki-Shampine 3(2) pair with local error control; spike times are
+    # located on the cubic Hermite interpolant of the step crossing
+    # spike_value, the state is reset at that time. Returns the number of
+    # samples, spikes and right hand side evaluations.
+    t = 0.
+    V = V0
+    u = u0
+    t_out[0] = t
+    V_out[0] = V
+    u_out[0] = u
+    n = 1
+    spikes = 0
+    nfev = 0
+    segment = 0
+    h = min(max_step, 1.)
+    fresh = True                            # k1 has to be (re)evaluated
+    k1V = 0.
+    k1u = 0.
+    while t < T:
+        while segment < len(edges) and edges[segment] <= t:
+            segment += 1
+        end = min(edges[segment] if segment < len(edges) else T, T)
+        I = levels[segment]
+        if fresh:
+            k1V = (0.04*V + 5)*V + 140 - u + I
+            k1u = a*(b*V - u)
+            nfev += 1
+            fresh = False
+
+        h = min(h, max_step, end - t)
+        k2V_in = V + 0.5*h*k1V
+        k2u_in = u + 0.5*h*k1u
+        k2V = (0.04*k2V_in + 5)*k2V_in + 140 - k2u_in + I
+        k2u = a*(b*k2V_in - k2u_in)
+        k3V_in = V + 0.75*h*k2V
+        k3u_in = u + 0.75*h*k2u
+        k3V = (0.04*k3V_in + 5)*k3V_in + 140 - k3u_in + I
+        k3u = a*(b*k3V_in - k3u_in)
+        V1 = V + h*(2/9*k1V + 1/3*k2V + 4/9*k3V)
+        u1 = u + h*(2/9*k1u + 1/3*k2u + 4/9*k3u)
+        k4V = (0.04*V1 + 5)*V1 + 140 - u1 + I
+        k4u = a*(b*V1 - u1)
+        nfev += 3
+
+        # error estimate of the embedded 2nd order solution
+        errV = h*(-5/72*k1V + 1/12*k2V + 1/9*k3V - 1/8*k4V)
+        erru = h*(-5/72*k1u + 1/12*k2u + 1/9*k3u - 1/8*k4u)
+        err = max(abs(errV)/(atol + rtol*max(abs(V), abs(V1))),
+                  abs(erru)/(atol + rtol*max(abs(u), abs(u1))))
+        if not err <= 1.:                   # also rejects overflow (nan)
+            h *= max(0.2, 0.9*err**(-1/3)) if err < math.inf else 0.2
+            continue
+
+        if n + 2 > len(t_out):
+            return -1, spikes, nfev
+        if V1 >= spike_value:
+            # bisection for the crossing on the Hermite interpolant of V
+            lo = 0.
+            hi = 1.
+            for _ in range(50):
+                s = 0.5*(lo + hi)
+                H = ((2*s**3 - 3*s**2 + 1)*V + (s**3 - 2*s**2 + s)*h*k1V
+                     + (-2*s**3 + 3*s**2)*V1 + (s**3 - s**2)*h*k4V)
+                if H < spike_value:
+                    lo = s
+                else:
+                    hi = s
+            s = hi
+            u_spike = ((2*s**3 - 3*s**2 + 1)*u + (s**3 - 2*s**2 + s)*h*k1u
+                       + (-2*s**3 + 3*s**2)*u1 + (s**3 - s**2)*h*k4u)
+            t += s*h
+            t_out[n] = t
+            V_out[n] = spike_value
+            u_out[n] = u_spike
+            t_out[n+1] = t
+            V_out[n+1] = c
+            u_out[n+1] = u_spike + d
+            n += 2
+            V = c
+            u = u_spike + d
+            spike_times[spikes] = t
+            spikes += 1
+            fresh = True
+        else:
+            t = t + h if t + h < end else end
+            V = V1
+            u = u1
+            t_out[n] = t
+            V_out[n] = V
+            u_out[n] = u
+            n += 1
+            # first same as last, unless a current edge was reached
+            k1V = k4V
+            k1u = k4u
+            fresh = t >= end
+        h *= min(5., 0.9*err**(-1/3)) if err > 0. else 5.
+    return n, spikes, nfev
+
+#==============================================================================#
+
+PYTHON_KERNELS = {
+    "LIF":              _LIF_loop,
+    "FitzHugh_Nagumo":  _FitzHugh_Nagumo_loop,
+    "Izhikevich":       _Izhikevich_loop,
+    "LIF_exact":        _LIF_exact_loop,
+    "Izhikevich_adaptive":  _Izhikevich_adaptive_loop,
+}
+
+if NUMBA_AVAILABLE:
+    COMPILED_KERNELS = {name: njit(cache=True)(loop)
+                        for name, loop in PYTHON_KERNELS.items()}
+else:
+    COMPILED_KERNELS = {}
+
+# "numba" or "python"; NEURON_SIM_BACKEND=python forces the fallback loops
+backend = os.environ.get("NEURON_SIM_BACKEND",
+                         "numba" if NUMBA_AVAILABLE else "python")
+
+
+def set_backend(name):
+    global backend
+    if name not in ("numba", "python"):
+        raise ValueError("Unknown backend '{}', use 'numba' or 'python'".format(name))
+    if name == "numba" and not NUMBA_AVAILABLE:
+        raise ImportError("The 'numba' backend requires Numba to be installed")
+    backend = name
+
+
+def get_kernel(name, backend_name=None):
+    backend_name = backend_name or backend
+    if backend_name == "numba" and NUMBA_AVAILABLE:
+        return COMPILED_KERNELS[name]
+    return PYTHON_KERNELS[name]
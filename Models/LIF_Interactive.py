@@ -5,12 +5,21 @@ Interative plot, showcasing the Leaky Integrate-and-Fire Model
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import  Button, Slider
+
+if not __package__:
+    import Script_Setup                 # run as a script, see Models/Script_Setup.py
+
+from Models.Kernels import get_kernel
+from Models.Result_Cache import SIMULATION_CACHE
+from Models.Streaming import stream_blocks, BLOCK_SIZE
+from Models.Stimulus import Protocol, Step
 
 #==============================================================================#
 
-def LIF(_I=0.005, gl=0.16, Cm=0.0049):
+# stimulus of unit amplitude, scaled by _I [A]
+PROTOCOL = Protocol(Step(0.020, 0.080))
+
+def LIF(_I=0.005, gl=0.16, Cm=0.0049, return_spikes=False, protocol=None):
 
     ######### Constants
     El      =   -0.065                      # restint membrane potential [V]
@@ -25,33 +34,171 @@ def LIF(_I=0.005, gl=0.16, Cm=0.0049):
     V       =   np.empty(len(time))         # array for saving Voltage history
     V[0]    =   El                          # set initial to resting potential
     # CURRENT
-    I = np.zeros(len(time))
-    I[1000:4000] = _I
+    I = I_values(_I, time, protocol)
     ######### Measurements
-    spikes  =   0                           # counter for number of spikes
+    spike_index = np.empty(len(time), dtype=np.int64)   # sample of each spike peak
 
     ######### Simulation
-    for i in range(1, len(time)):
-        # use "I - V/R = C * dV/dT" to get this equation
-        dV =  (I[i] - gl*(V[i-1]-El))/Cm
-        V[i] = V[i-1] + dV*dt
+    spikes  =   get_kernel("LIF")(V, I, gl, Cm, El, thresh, dt, spike_index)
+
+    if return_spikes:
+        return V, time[spike_index[:spikes]]
+    return V
+
+def LIF_step(V, I, gl, Cm, dt, El=-0.065, thresh=-0.050):
+    # one Euler step of N neurons (arrays, updated in place) as in LIF();
+    # returns the mask of neurons above thresh, which are reset to El
+    V      += (I - gl*(V - El))/Cm*dt
+    spike   = V > thresh
+    V[spike] = El
+    return spike
+
+def LIF_adaptive(_I=0.005, gl=0.16, Cm=0.0049, max_step=np.inf, return_spikes=False,
+                 protocol=None):
+    # exact solution between the edges of the step current: only current
+    # edges and spikes cost a step, max_step adds samples for plotting.
+    # Returns the non-uniform sample times and V
+
+    ######### Constants
+    El      =   -0.065                      # restint membrane potential [V]
+    thresh  =   -0.050                      # spiking threshold [V]
+    T       =   0.100                       # total simulation length [s]
+
+    ######### Current (edges [s] and levels in between)
+    edges, levels = (protocol or PROTOCOL).segments(_I)
+    if not all(np.isscalar(level) for level in levels):
+        raise ValueError("LIF_adaptive needs a piecewise constant protocol")
+    edges, levels = np.array(edges, dtype=float), np.array(levels, dtype=float)
+
+    ######### Simulation (retry with larger outputs if they overflow)
+    capacity = 1024
+    while True:
+        time, V = np.empty(capacity), np.empty(capacity)
+        spike_times = np.empty(capacity)
+        n, spikes = get_kernel("LIF_exact")(edges, levels, El, gl, Cm, El, thresh, T,
+                                            max_step, time, V, spike_times)
+        if n >= 0:
+            break
+        capacity *= 4
+
+    if return_spikes:
+        return time[:n], V[:n], spike_times[:spikes]
+    return time[:n], V[:n]
+
+def LIF_period(_I=0.005, gl=0.16, Cm=0.0049):
+    # closed-form inter-spike interval [s] under a constant current, from
+    # V(t) = V_inf + (El - V_inf)*exp(-t/tau) reaching thresh; inf if V_inf
+    # stays below threshold. Parameters may be arrays (broadcast)
+
+    ######### Constants
+    El      =   -0.065                      # restint membrane potential [V]
+    thresh  =   -0.050                      # spiking threshold [V]
+
+    _I, gl, Cm = np.broadcast_arrays(*(np.asarray(p, dtype=float) for p in (_I, gl, Cm)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # gl*(thresh - El) is the current needed to hold V at threshold
+        drive   = _I - gl*(thresh - El)
+        period  = Cm/gl * np.log1p(gl*(thresh - El)/drive)
+        # perfect integrator for gl = 0
+        period  = np.where(gl == 0, Cm*(thresh - El)/_I, period)
+    return np.where(drive > 0, period, np.inf)
+
+def _single_step(protocol):
+    # stimulus window [s] and amplitude of a protocol made of one Step, the
+    # only stimulus with a closed-form solution here
+    protocol = protocol or PROTOCOL
+    if len(protocol.components) != 1 or type(protocol.components[0]) is not Step:
+        raise ValueError("The closed-form LIF solution needs a protocol of a single Step")
+    step = protocol.components[0]
+    return step.t_on, step.t_off, step.amplitude
+
+def LIF_spike_times(_I=0.005, gl=0.16, Cm=0.0049, max_spikes=None, protocol=None):
+    # closed-form spike times [s] of LIF(), without any time stepping: V rests
+    # at El until the step current starts, so the k-th spike lies at
+    # t_on + k*period. Returns the spike count per parameter combination and
+    # their times, padded with nan to max_spikes (default: the largest count)
+    t_on, t_off, amplitude = _single_step(protocol)
 
-        # in case we exceed threshold
-        if V[i] > thresh:
-            V[i-1] = 0.04   # set the last step to spike value
-            V[i] = El       # current step is resting membrane potential
-            spikes += 1     # count spike
+    period = LIF_period(np.multiply(_I, amplitude), gl, Cm)
+    count = np.floor((t_off - t_on)/period).astype(np.int64)
+    if max_spikes is None:
+        max_spikes = int(count.max(initial=0))
+    k = np.arange(1, max_spikes + 1)
+    times = t_on + k*period[..., None]
+    return count, np.where(k <= count[..., None], times, np.nan)
 
+def LIF_trace(_I=0.005, gl=0.16, Cm=0.0049, time=None, protocol=None):
+    # voltage traces of the closed-form solution at the given sample times,
+    # built with vectorized exponentials; spike peaks are set on the last
+    # sample before every spike like in LIF(). Returns an array of shape
+    # params.shape + time.shape
+
+    ######### Constants
+    El      =   -0.065                      # restint membrane potential [V]
+    t_on, t_off, amplitude = _single_step(protocol)
+
+    if time is None:
+        time = np.arange(0, 0.100+0.00002, 0.00002)
+    _I, gl, Cm = (p[..., None] for p in
+                  np.broadcast_arrays(*(np.asarray(p, dtype=float) for p in (_I, gl, Cm))))
+    count, spike_times = LIF_spike_times(_I[..., 0], gl[..., 0], Cm[..., 0], protocol=protocol)
+    _I = _I*amplitude
+    period = LIF_period(_I, gl, Cm)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # time since the last reset (or the stimulus onset)
+        since   = np.clip(time, t_on, t_off) - t_on
+        spikes  = np.where(np.isfinite(period), np.floor(since/period), 0.)
+        since   = since - np.minimum(spikes, count[..., None])*np.where(np.isfinite(period), period, 0.)
+        tau     = Cm/gl
+        V       = np.where(gl == 0, El + _I/Cm*since,
+                           El + _I/gl*(1 - np.exp(-since/tau)))
+        # no current after the stimulus, V relaxes back to El
+        V       = np.where(time > t_off,
+                           El + (V - El)*np.where(gl == 0, 1., np.exp(-(time - t_off)/tau)), V)
+
+    # spike peaks
+    peaks = np.searchsorted(time, spike_times) - 1
+    rows = np.nonzero(~np.isnan(spike_times))
+    V[rows[:-1] + (peaks[rows],)] = 0.04
     return V
 
-def I_values(_I=0.005, time=None):
-    I = np.zeros(len(time))
-    I[1000:4000] = _I
-    return I
+def LIF_stream(_I=0.005, gl=0.16, Cm=0.0049, T=0.100, dt=0.00002, block_size=BLOCK_SIZE,
+               protocol=None):
+    # yields (time, V) blocks, identical to LIF() for the default T and dt
+
+    ######### Constants
+    El      =   -0.065                      # restint membrane potential [V]
+    thresh  =   -0.050                      # spiking threshold [V]
+
+    kernel = get_kernel("LIF")
+    protocol = protocol or PROTOCOL
+
+    def run_block(buffers, indices):
+        V, = buffers
+        I = _I * protocol.values(indices, dt)
+        kernel(V, I, gl, Cm, El, thresh, dt, np.empty(len(V), dtype=np.int64))
+
+    return stream_blocks(run_block, (El,), T, dt, block_size)
+
+def I_values(_I=0.005, time=None, protocol=None):
+    # stimulus current on the time grid, shared by the simulation and the plot
+    return (protocol or PROTOCOL).current(_I, len(time), time[1] - time[0])
 
 #==============================================================================#
 
 def start_LIF_sim():
+    # GUI dependencies are imported on first use, the model functions above
+    # only need NumPy
+    import matplotlib.pyplot as plt
+    from matplotlib.pyplot import Button, Slider
+
+    from Models.Update_Scheduler import UpdateScheduler
+    from Models.Compute_Backend import get_backend
+    from Models.Blit_Manager import BlitManager
+    from Models.Decimation import TraceDecimator
+    from Models.Profiler import UpdateProfiler
+
     # time parameters for plotting
     T       =   0.100                       # total simulation length [s]
     dt      =   0.00002                     # step size [s]
@@ -63,7 +210,7 @@ def start_LIF_sim():
     Cm_init =   0.0049
 
     # update functions for lines
-    V = LIF(_I=I_init, gl=gl_init, Cm=Cm_init)
+    V = SIMULATION_CACHE.lookup(LIF, I_init, gl_init, Cm_init)
     I = I_values(_I=I_init, time=time)
 
     ######### Plotting
@@ -95,15 +242,38 @@ def start_LIF_sim():
     Cm_slider_axis = plt.axes([0.1, 0.07, 0.65, 0.03], facecolor=axis_color)
     Cm_slider = Slider(Cm_slider_axis, '$C_{m}$', 0.0, 0.01, valinit=Cm_init)
 
+    # per-update stage timings, toggled with the 'i' key
+    profiler = UpdateProfiler(fig)
+
+    # only the data lines and slider knobs are redrawn on an update
+    blitter = BlitManager(fig, [line, line2, profiler.overlay],
+                          [I_slider, gl_slider, Cm_slider])
+    redraw = profiler.redraw(blitter.update)
+
+    # traces are decimated to the screen resolution (min/max per pixel)
+    decimator = TraceDecimator([line, line2])
+
+    # simulations run in the background, lines are swapped once they finish
+    channel = get_backend().channel(fig, redraw=redraw, profiler=profiler)
+
     # update functions
+    def show(V, params):
+        with profiler.stage("stimulus"):
+            I = I_values(params[0], time=time)
+        with profiler.stage("transfer"):
+            decimator.set_ydata(line, V)
+            decimator.set_ydata(line2, I)
+
     def update(val):
-        line.set_ydata(LIF(I_slider.val, gl_slider.val, Cm_slider.val))
-        line2.set_ydata(I_values(I_slider.val, time=time))
+        channel.submit(LIF, (I_slider.val, gl_slider.val, Cm_slider.val), show)
+
+    # coalesce slider events, at most one recompute per frame
+    scheduler = UpdateScheduler(fig, update, redraw=redraw)
 
     # update, if any slider is moved
-    I_slider.on_changed(update)
-    gl_slider.on_changed(update)
-    Cm_slider.on_changed(update)
+    I_slider.on_changed(scheduler.request)
+    gl_slider.on_changed(scheduler.request)
+    Cm_slider.on_changed(scheduler.request)
 
     # Add a button for resetting the parameters
     reset_button_ax = plt.axes([0.8, 0.02, 0.1, 0.04])
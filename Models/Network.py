@@ -0,0 +1,191 @@
+__author__ = "Devrim Celik"
+
+"""
+Spiking networks of Izhikevich or LIF neurons: the state of all N neurons is
+held in arrays and advanced with Euler steps. LIF neurons step as in LIF().
+Izhikevich neurons follow the network code of Izhikevich (2003) rather than
+Izhikevich_Model(): they start from u = b*V and are reset in the step that
+crosses 35 mV (Izhikevich_Model() marks that sample as the peak and resets
+in the next step). Synapses are stored as a sparse CSR matrix (row =
+presynaptic neuron), every synapse has its own delay. Spikes are delivered
+through a ring buffer of delay slots and added to the input current of the
+step in which they arrive, like the synaptic input of Izhikevich (2003).
+
+Example:
+    net = izhikevich_2003_network(10000, synapses=100, seed=0)
+    spike_times, neurons = net.run(1000)
+"""
+
+import numpy as np
+from scipy import sparse
+
+from Models.Izhikevich_Interactive import Izhikevich_step
+from Models.LIF_Interactive import LIF_step
+
+#==============================================================================#
+
+# step size and time unit of every model, as in the single neuron engines
+TIME_STEPS = {
+    "Izhikevich":   (0.5, 1e-3),            # [ms]
+    "LIF":          (0.00002, 1.),          # [s]
+}
+
+
+def random_weights(N, synapses, weight=1., N_post=None, seed=None):
+    # sparse (N, N_post) weight matrix with a fixed number of random targets
+    # per presynaptic neuron; weight may be a scalar, an array of N (one
+    # value per presynaptic neuron) or a function rng, size -> weights
+    rng = np.random.default_rng(seed)
+    N_post = N if N_post is None else N_post
+    indices = rng.integers(0, N_post, size=N * synapses, dtype=np.int32)
+    indptr = np.arange(0, N * synapses + 1, synapses, dtype=np.int64)
+    if callable(weight):
+        data = weight(rng, N * synapses)
+    else:
+        data = np.repeat(np.broadcast_to(np.asarray(weight, dtype=float), (N,)), synapses)
+    return sparse.csr_matrix((data, indices, indptr), shape=(N, N_post))
+
+
+class Network:
+
+    def __init__(self, model, weights, delays=1., params=None, I_ext=0., noise=0.,
+                 dt=None, seed=None):
+        # weights:  (N, N) matrix, row = presynaptic neuron (sparse or dense)
+        # delays:   synaptic delay in the model's time unit, a scalar or one
+        #           value per stored synapse (in the order of weights.data)
+        # params:   model parameters, scalars or arrays of N
+        #           Izhikevich: a, b, c, d     LIF: gl, Cm
+        # I_ext:    constant input current, scalar or array of N
+        # noise:    standard deviation of a random input current per step
+        if model not in TIME_STEPS:
+            raise ValueError("Unknown model '{}', use one of {}".format(model, sorted(TIME_STEPS)))
+        self.model      =   model
+        self.dt         =   TIME_STEPS[model][0] if dt is None else dt
+        self.weights    =   sparse.csr_matrix(weights)
+        self.N          =   self.weights.shape[0]
+        self.rng        =   np.random.default_rng(seed)
+
+        ######### Synapses (CSR arrays) and their delays in steps
+        self._indptr    =   self.weights.indptr
+        self._targets   =   self.weights.indices
+        self._w         =   self.weights.data
+        delays = np.broadcast_to(np.asarray(delays, dtype=float), self._w.shape)
+        self._delays    =   np.maximum(np.rint(delays / self.dt), 1).astype(np.int32)
+        # with a single delay all spikes of a step arrive in the same slot
+        self._delay     =   int(self._delays[0]) if len(self._delays) and \
+                            np.all(self._delays == self._delays[0]) else None
+        # ring buffer: one row of input per step, long enough for the largest delay
+        self.slots      =   int(self._delays.max(initial=1)) + 1
+        self._buffer    =   np.zeros((self.slots, self.N))
+
+        ######### Neurons
+        defaults = {"Izhikevich": {"a": 0.02, "b": 0.2, "c": -65, "d": 8},
+                    "LIF":        {"gl": 0.16, "Cm": 0.0049}}[model]
+        params = dict(defaults, **(params or {}))
+        self.params     =   {name: np.broadcast_to(np.asarray(value, dtype=float), (self.N,))
+                             for name, value in params.items()}
+        self.I_ext      =   np.broadcast_to(np.asarray(I_ext, dtype=float), (self.N,))
+        self.noise      =   np.broadcast_to(np.asarray(noise, dtype=float), (self.N,))
+        self._noisy     =   bool(np.any(self.noise))
+        self.reset()
+
+    def reset(self):
+        if self.model == "Izhikevich":
+            self.V = np.full(self.N, -70.)      # set initial to resting potential
+            self.u = self.params["b"] * self.V
+        else:
+            self.V = np.full(self.N, -0.065)    # resting membrane potential [V]
+        self._buffer[:] = 0.
+        self.steps = 0
+
+    ######### Simulation
+    def _deliver(self, spiking):
+        # add the weights of all outgoing synapses of the spiking neurons to
+        # the buffer row of their arrival step
+        starts = self._indptr[spiking]
+        counts = self._indptr[spiking + 1] - starts
+        total = counts.sum()
+        if total == 0:
+            return
+        # indices of all synapses of the spiking neurons, without a Python loop
+        synapses = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        if self._delay is not None:
+            slot = (self.steps + self._delay) % self.slots
+            self._buffer[slot] += np.bincount(self._targets[synapses], self._w[synapses],
+                                              minlength=self.N)
+            return
+        slots = (self.steps + self._delays[synapses]) % self.slots
+        np.add.at(self._buffer.reshape(-1), slots * self.N + self._targets[synapses],
+                  self._w[synapses])
+
+    def step(self):
+        # advances all neurons by one step, returns the indices of the neurons
+        # that spiked
+        slot = self.steps % self.slots
+        I = self.I_ext + self._buffer[slot]
+        self._buffer[slot] = 0.
+        if self._noisy:
+            I = I + self.noise * self.rng.standard_normal(self.N)
+
+        p = self.params
+        if self.model == "Izhikevich":
+            spike = Izhikevich_step(self.V, self.u, I, p["a"], p["b"], p["c"], p["d"],
+                                    self.dt, reset="same")
+        else:
+            spike = LIF_step(self.V, I, p["gl"], p["Cm"], self.dt)
+        spiking = np.nonzero(spike)[0]
+
+        if len(spiking):
+            self._deliver(spiking)
+        self.steps += 1
+        return spiking
+
+    def run(self, T, record=None):
+        # simulates T (in the model's time unit) from the current state;
+        # returns the spike times and neuron indices of all spikes and, if
+        # record lists neuron indices, their (steps, len(record)) voltages
+        n_steps = int(round(T / self.dt))
+        t0 = self.steps * self.dt
+        spikes = []
+        trace = None if record is None else np.empty((n_steps, len(record)))
+        for k in range(n_steps):
+            spikes.append(self.step())
+            if trace is not None:
+                trace[k] = self.V[record]
+
+        counts = [len(s) for s in spikes]
+        spike_times = t0 + np.repeat(np.arange(1, n_steps + 1), counts) * self.dt
+        neurons = np.concatenate(spikes) if spikes else np.empty(0, dtype=np.int64)
+        if trace is not None:
+            return spike_times, neurons, trace
+        return spike_times, neurons
+
+#==============================================================================#
+
+def izhikevich_2003_network(N=1000, synapses=None, excitatory=0.8, delay=1., seed=None):
+    # randomly connected network of regular spiking/chattering excitatory and
+    # fast spiking/low-threshold inhibitory neurons with thalamic noise, as in
+    # Izhikevich, "Simple Model of Spiking Neurons" (2003). Weights are scaled
+    # so that every neuron receives the same total input as in the fully
+    # connected original with 1000 neurons. The original applies its input
+    # for 1 ms steps, here for steps of dt = 0.5 ms, so synaptic weights and
+    # noise are rescaled to the same charge and variance per ms
+    dt = TIME_STEPS["Izhikevich"][0]
+    rng = np.random.default_rng(seed)
+    synapses = N if synapses is None else synapses
+    N_exc = int(round(excitatory * N))
+    r = rng.random(N)
+    exc = np.arange(N) < N_exc
+
+    params = {
+        "a":    np.where(exc, 0.02, 0.02 + 0.08 * r),
+        "b":    np.where(exc, 0.2, 0.25 - 0.05 * r),
+        "c":    np.where(exc, -65 + 15 * r**2, -65),
+        "d":    np.where(exc, 8 - 6 * r**2, 2),
+    }
+    scale = 1000. / synapses / dt
+    weights = random_weights(N, synapses, seed=rng,
+                             weight=lambda rng, size: rng.random(size) * scale)
+    weights.data *= np.repeat(np.where(exc, 0.5, -1.), synapses)
+    return Network("Izhikevich", weights, delays=delay, params=params,
+                   noise=np.where(exc, 5., 2.) / np.sqrt(dt), seed=rng)
@@ -0,0 +1,251 @@
+__author__ = "Devrim Celik"
+
+"""
+Multi-process execution of large, independent neuron populations (Izhikevich,
+LIF, FitzHugh-Nagumo). The population is split into contiguous slices, one
+per worker process. State, parameters and results live in shared memory, so
+workers update their slice in place and the caller reads the results as
+NumPy views without pickling any array. Workers advance in lockstep: every
+sync_every steps all of them meet at a barrier.
+
+Example:
+    with PopulationExecutor("Izhikevich", _I=np.linspace(0, 20, 10**6)) as pop:
+        pop.run(1000)
+        rates = pop.spike_counts / 1.0      # [Hz] over the 1 s run
+"""
+
+import importlib
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+
+import numpy as np
+
+from Models.Izhikevich_Interactive import Izhikevich_step
+from Models.LIF_Interactive import LIF_step
+from Models.FitzHugh_Nagumo_Interactive import FitzHugh_Nagumo_step
+
+#==============================================================================#
+
+# module (its PROTOCOL is the default stimulus), state variables and initial
+# values, parameters and defaults, step size and the offset of the current
+# sample used by a step (the single neuron loops of LIF and FitzHugh-Nagumo
+# use the current of the new sample, Izhikevich the one of the old sample)
+MODELS = {
+    "Izhikevich":       ("Models.Izhikevich_Interactive",
+                         {"V": -70., "u": -14.}, {"a": 0.02, "b": 0.2, "c": -65., "d": 8.},
+                         0.5, 0),
+    "LIF":              ("Models.LIF_Interactive",
+                         {"V": -0.065}, {"gl": 0.16, "Cm": 0.0049},
+                         0.00002, 1),
+    "FitzHugh_Nagumo":  ("Models.FitzHugh_Nagumo_Interactive",
+                         {"V": -0.7, "W": -0.5}, {"a": 0.7, "b": 0.8, "tau": 1 / 0.08},
+                         0.01, 1),
+}
+
+RUN, STOP = 0, 1
+
+
+# the vectorized steps of the engines, on state (s) and parameter (p) dicts
+def _step_Izhikevich(s, p, I, dt):
+    return Izhikevich_step(s["V"], s["u"], I, p["a"], p["b"], p["c"], p["d"], dt)
+
+def _step_LIF(s, p, I, dt):
+    return LIF_step(s["V"], I, p["gl"], p["Cm"], dt)
+
+def _step_FitzHugh_Nagumo(s, p, I, dt):
+    return FitzHugh_Nagumo_step(s["V"], s["W"], I, p["a"], p["b"], p["tau"], dt)
+
+STEPS = {
+    "Izhikevich":       _step_Izhikevich,
+    "LIF":              _step_LIF,
+    "FitzHugh_Nagumo":  _step_FitzHugh_Nagumo,
+}
+
+
+def _attach(spec):
+    # numpy views of shared memory blocks, spec: name -> (block name, shape, dtype)
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in spec.items():
+        try:
+            block = shared_memory.SharedMemory(name=block_name, track=False)
+        except TypeError:                   # Python < 3.13 has no track argument
+            block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+def _advance(model, arrays, start, stop, n_steps, step0, dt, protocol, sync=None,
+             sync_every=1):
+    # n_steps of the slice [start, stop), starting at global step step0
+    _, states, params, _, offset = MODELS[model]
+    step = STEPS[model]
+    s = {name: arrays[name][start:stop] for name in states}
+    p = {name: arrays[name][start:stop] for name in params}
+    amplitude = arrays["_I"][start:stop]
+    counts = arrays["spike_counts"][start:stop]
+    last = arrays["last_spike"][start:stop]
+    waveform = protocol.values(np.arange(step0, step0 + n_steps) + offset, dt)
+    # LIF and Izhikevich report the sample before the reset (as their single
+    # neuron loops), FitzHugh-Nagumo the first sample above threshold
+    spike_offset = 1 if model == "FitzHugh_Nagumo" else 0
+
+    for k in range(n_steps):
+        n = step0 + k
+        spike = step(s, p, amplitude * waveform[k], dt)
+        counts += spike
+        last[spike] = (n + spike_offset) * dt
+        if sync is not None and (k + 1) % sync_every == 0:
+            sync.wait()
+
+
+def _worker(model, spec, start, stop, dt, protocol, control_spec, start_barrier,
+            step_barrier):
+    blocks, arrays = _attach(dict(spec, control=control_spec))
+    control = arrays["control"]
+    try:
+        while True:
+            start_barrier.wait()
+            command, n_steps, step0, sync_every = control
+            if command == STOP:
+                break
+            _advance(model, arrays, start, stop, n_steps, step0, dt, protocol,
+                     step_barrier, sync_every)
+            start_barrier.wait()
+    except BrokenBarrierError:
+        pass
+    except BaseException:
+        # wake up the other workers and the caller
+        start_barrier.abort()
+        step_barrier.abort()
+        raise
+    finally:
+        del arrays, control
+        for block in blocks:
+            block.close()
+
+
+class PopulationExecutor:
+
+    def __init__(self, model, N=None, _I=0., params=None, workers=None, dt=None,
+                 sync_every=1, protocol=None):
+        # _I and params (model parameters, see MODELS) may be scalars or arrays
+        # of N; workers=0 runs in the calling process (no shared memory).
+        # protocol defaults to the one of the model's module
+        if model not in MODELS:
+            raise ValueError("Unknown model '{}', use one of {}".format(model, sorted(MODELS)))
+        module, states, defaults, default_dt, _ = MODELS[model]
+        params = dict(defaults, **(params or {}))
+        if N is None:
+            N = np.broadcast(*(np.asarray(value) for value in
+                               [_I] + list(params.values()))).size
+        self.model      =   model
+        self.N          =   int(N)
+        self.dt         =   default_dt if dt is None else dt
+        self.protocol   =   protocol or importlib.import_module(module).PROTOCOL
+        self.sync_every =   int(sync_every)
+        self.steps      =   0
+        self.workers    =   os.cpu_count() if workers is None else int(workers)
+        self.workers    =   min(self.workers, self.N)
+
+        ######### Arrays (state, parameters, stimulus amplitude and results)
+        initial = {name: value for name, value in states.items()}
+        initial.update(params)
+        initial["_I"] = _I
+        layout = {name: (np.float64, value) for name, value in initial.items()}
+        layout["spike_counts"] = (np.int64, 0)
+        layout["last_spike"] = (np.float64, np.nan)
+
+        self._blocks = []
+        self._spec = {}
+        self.arrays = {}
+        for name, (dtype, value) in layout.items():
+            array = self._allocate(name, (self.N,), dtype)
+            array[:] = value
+            self.arrays[name] = array
+
+        self._processes = []
+        if self.workers > 0:
+            self._control = self._allocate("control", (4,), np.int64)
+            self._control_spec = self._spec.pop("control")
+            context = multiprocessing.get_context()
+            self._start_barrier = context.Barrier(self.workers + 1)
+            self._step_barrier = context.Barrier(self.workers)
+            bounds = np.linspace(0, self.N, self.workers + 1).astype(int)
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                process = context.Process(
+                    target=_worker, daemon=True,
+                    args=(model, self._spec, int(start), int(stop), self.dt, self.protocol,
+                          self._control_spec, self._start_barrier, self._step_barrier))
+                process.start()
+                self._processes.append(process)
+
+    def _allocate(self, name, shape, dtype):
+        if self.workers == 0:
+            return np.empty(shape, dtype=dtype)
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._blocks.append(block)
+        self._spec[name] = (block.name, shape, np.dtype(dtype).str)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    ######### Results (views into shared memory, no copies)
+    @property
+    def state(self):
+        return {name: self.arrays[name] for name in MODELS[self.model][1]}
+
+    @property
+    def spike_counts(self):
+        return self.arrays["spike_counts"]
+
+    @property
+    def last_spike(self):
+        return self.arrays["last_spike"]
+
+    @property
+    def time(self):
+        return self.steps * self.dt
+
+    ######### Execution
+    def run(self, T):
+        # advances the whole population by T (in the model's time unit)
+        n_steps = int(round(T / self.dt))
+        if self.workers == 0:
+            _advance(self.model, self.arrays, 0, self.N, n_steps, self.steps, self.dt,
+                     self.protocol)
+        else:
+            self._control[:] = (RUN, n_steps, self.steps, self.sync_every)
+            try:
+                self._start_barrier.wait()      # start
+                self._start_barrier.wait()      # all slices done
+            except BrokenBarrierError:
+                raise RuntimeError("a population worker failed")
+        self.steps += n_steps
+
+    def close(self):
+        if self._processes:
+            self._control[:] = (STOP, 0, 0, 1)
+            try:
+                self._start_barrier.wait(timeout=10)
+            except BrokenBarrierError:
+                pass
+            for process in self._processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            self._processes = []
+        # views have to be released before the memory can be closed
+        self.arrays = {}
+        self._control = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
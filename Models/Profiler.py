@@ -0,0 +1,151 @@
+__author__ = "Devrim Celik"
+
+"""
+Instrumentation of the interactive plots: for every displayed update the time
+spent in each stage is recorded. The stages are simulate (in the worker, 0 for
+cached results), stimulus (building the current trace), transfer (handing the
+data to the lines, including decimation) and draw (the blitted redraw). The
+solver's RHS and Jacobian calls are recorded where the model reports them.
+The latest record is shown as an overlay on the figure, and all records can
+be written as JSON lines.
+
+Profiling is switched on and off at runtime with the 'i' key. When it is off,
+every hook returns right away. NEURON_SIM_PROFILE=1 switches it on at start;
+NEURON_SIM_PROFILE_LOG=<file> appends every record to that file.
+
+Example:
+    NEURON_SIM_PROFILE=1 NEURON_SIM_PROFILE_LOG=hh.jsonl python -m Models.Hodgkin_Huxley_Interactive
+"""
+
+import json
+import os
+import time as timer
+from collections import deque
+
+#==============================================================================#
+
+STAGES = ("simulate", "stimulus", "transfer", "draw")
+
+
+class _NullStage:
+    # context of a stage that is not recorded, shared by all of them
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("record", "name", "start")
+
+    def __init__(self, record, name):
+        self.record =   record
+        self.name   =   name
+
+    def __enter__(self):
+        self.start = timer.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.record[self.name] += timer.perf_counter() - self.start
+        return False
+
+
+class UpdateProfiler:
+
+    def __init__(self, fig, enabled=None, log=None, max_records=1000, key="i"):
+        if enabled is None:
+            enabled = os.environ.get("NEURON_SIM_PROFILE", "0") not in ("", "0")
+        self.fig        =   fig
+        self.enabled    =   bool(enabled)
+        self.log        =   log or os.environ.get("NEURON_SIM_PROFILE_LOG")
+        self.key        =   key             # toggles profiling and the overlay
+        self.updates    =   0               # recorded updates
+        self.records    =   deque(maxlen=max_records)
+        self._record    =   None            # the update being recorded
+        self.overlay    =   fig.text(0.005, 0.995, "", ha="left", va="top",
+                                     family="monospace", fontsize=8,
+                                     bbox={"facecolor": "white", "alpha": 0.8},
+                                     visible=self.enabled)
+        fig.canvas.mpl_connect("key_press_event", self._on_key)
+
+    ######### Hooks (no-ops while disabled)
+    def begin(self, params, compute_time, cached=False):
+        # a result arrived and is about to be shown (see ComputeChannel)
+        if not self.enabled:
+            return
+        self._record = {"update": self.updates, "time": timer.time(),
+                        "params": [float(param) for param in params],
+                        "cached": bool(cached), "simulate": compute_time,
+                        "stimulus": 0., "transfer": 0., "draw": 0.}
+
+    def stage(self, name):
+        # context manager timing one stage of the current update
+        if self._record is None:
+            return NULL_STAGE
+        return _Stage(self._record, name)
+
+    def count(self, info):
+        # solver statistics of the current result, e.g. {"nfev": .., "njev": ..}
+        if self._record is not None:
+            self._record.update(info)
+
+    def redraw(self, redraw):
+        # wraps a redraw function: its time is the draw stage, and it
+        # completes the current update
+        def timed_redraw():
+            if self._record is None:
+                return redraw()
+            with self.stage("draw"):
+                redraw()
+            self._finish()
+        return timed_redraw
+
+    def _finish(self):
+        record, self._record = self._record, None
+        record["total"] = sum(record[stage] for stage in STAGES)
+        self.records.append(record)
+        self.updates += 1
+        if self.log:
+            with open(self.log, "a") as file:
+                file.write(json.dumps(record) + "\n")
+        # shown with the next redraw
+        self.overlay.set_text(self.format(record))
+
+    ######### Output
+    @staticmethod
+    def format(record):
+        lines = ["update {}{}".format(record["update"], " (cached)" if record["cached"] else "")]
+        lines += ["{:<9}{:8.2f} ms".format(stage, record[stage] * 1e3) for stage in STAGES]
+        lines.append("{:<9}{:8.2f} ms".format("total", record["total"] * 1e3))
+        if "nfev" in record:
+            lines.append("RHS {} / Jac {}".format(record["nfev"], record.get("njev", 0)))
+        return "\n".join(lines)
+
+    def summary(self):
+        # mean and maximum [s] of every stage over the kept records
+        summary = {}
+        for stage in STAGES + ("total",):
+            times = [record[stage] for record in self.records]
+            if times:
+                summary[stage] = {"mean": sum(times) / len(times), "max": max(times)}
+        return summary
+
+    def export(self, path):
+        with open(path, "w") as file:
+            for record in self.records:
+                file.write(json.dumps(record) + "\n")
+
+    ######### Toggle
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+        self._record = None
+        self.overlay.set_visible(self.enabled)
+        self.fig.canvas.draw_idle()
+
+    def _on_key(self, event):
+        if event.key == self.key:
+            self.set_enabled(not self.enabled)
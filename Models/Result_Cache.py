@@ -0,0 +1,113 @@
+__author__ = "Devrim Celik"
+
+"""
+Memoization of simulation results, shared by the interactive plots: results
+are keyed on the (quantized) model parameters and evicted in least recently
+used order once the memory budget is exceeded
+"""
+
+from collections import OrderedDict
+from numbers import Real
+from threading import Lock
+
+import numpy as np
+
+#==============================================================================#
+
+def quantize(value, digits=6):
+    # round numbers to a fixed number of significant digits, so slider values
+    # that only differ in float noise share one cache entry
+    if isinstance(value, Real) and not isinstance(value, bool):
+        return float("{:.{}g}".format(value, digits))
+    return value
+
+
+def result_nbytes(result):
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(result_nbytes(item) for item in result)
+    return 0
+
+
+def freeze(result):
+    # cached arrays are shared between callers, so they must not be modified
+    if isinstance(result, np.ndarray):
+        result.flags.writeable = False
+    elif isinstance(result, (tuple, list)):
+        for item in result:
+            freeze(item)
+    return result
+
+
+class ResultCache:
+
+    def __init__(self, max_bytes=256 * 2**20, digits=6):
+        self.max_bytes  =   max_bytes       # memory budget of all results
+        self.digits     =   digits          # significant digits of the keys
+        self.nbytes     =   0
+        self.hits       =   0
+        self.misses     =   0
+        self._entries   =   OrderedDict()   # key -> (result, size)
+        self._lock      =   Lock()
+
+    def key(self, func, args, kwargs):
+        return ((func.__module__, func.__qualname__),
+                tuple(quantize(arg, self.digits) for arg in args),
+                tuple(sorted((name, quantize(arg, self.digits))
+                             for name, arg in kwargs.items())))
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, result):
+        size = result_nbytes(result)
+        if size > self.max_bytes:
+            return result
+        freeze(result)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self.nbytes += size
+            # evict least recently used results until we are within budget
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+        return result
+
+    def lookup(self, func, *args, **kwargs):
+        # return func(*args, **kwargs), simulating only on a cache miss; the
+        # simulation itself runs on the quantized parameters
+        key = self.key(func, args, kwargs)
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        return self.put(key, func(*key[1], **dict(key[2])))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "nbytes": self.nbytes,
+                "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+# shared by all interactive simulations
+SIMULATION_CACHE = ResultCache()
@@ -0,0 +1,17 @@
+__author__ = "Devrim Celik"
+
+"""
+Imported by the model modules when they run as scripts (e.g. python
+Models/LIF_Interactive.py): then only Models/ is on sys.path, so the
+repository root is added for their "from Models.X import" imports.
+"""
+
+import os
+import sys
+
+#==============================================================================#
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,70 @@
+__author__ = "Devrim Celik"
+
+"""
+Spike features of a simulation: spike times, firing rate, inter-spike interval
+statistics and bursts. LIF and Izhikevich report their spikes directly from
+the step loop, for HH and FitzHugh-Nagumo they are found as upward threshold
+crossings of V.
+"""
+
+import numpy as np
+
+#==============================================================================#
+
+def threshold_crossings(V, time, threshold):
+    # times of the upward crossings of V through threshold, linearly
+    # interpolated between the two samples around each crossing
+    V = np.asarray(V)
+    idx = np.nonzero((V[:-1] < threshold) & (V[1:] >= threshold))[0]
+    fraction = (threshold - V[idx]) / (V[idx + 1] - V[idx])
+    return time[idx] + fraction * (time[idx + 1] - time[idx])
+
+
+def detect_bursts(spike_times, max_isi, min_spikes=2):
+    # bursts are runs of at least min_spikes spikes, each closer than max_isi
+    # to its predecessor; returns a (n_bursts, 3) array of start, end, spikes
+    if len(spike_times) < min_spikes:
+        return np.empty((0, 3))
+    close = np.diff(spike_times) <= max_isi
+    # start and end (in ISI indices) of every run of close spikes
+    edges = np.diff(np.concatenate(([0], close.astype(np.int8), [0])))
+    starts = np.nonzero(edges == 1)[0]
+    ends = np.nonzero(edges == -1)[0]
+    n_spikes = ends - starts + 1
+    keep = n_spikes >= min_spikes
+    return np.column_stack((spike_times[starts[keep]], spike_times[ends[keep]],
+                            n_spikes[keep]))
+
+
+def burst_isi_threshold(spike_times, min_ratio=3.):
+    # ISI threshold separating bursts from the pauses between them: the
+    # sorted ISIs are split at their largest ratio gap, which must be at
+    # least min_ratio; returns 0 (no bursts) for unimodal ISIs
+    isi = np.sort(np.diff(spike_times))
+    if len(isi) < 2 or isi[0] <= 0:
+        return 0.
+    ratios = isi[1:] / isi[:-1]
+    k = ratios.argmax()
+    return np.sqrt(isi[k] * isi[k + 1]) if ratios[k] >= min_ratio else 0.
+
+
+def spike_features(spike_times, duration, max_burst_isi=None, min_burst_spikes=2):
+    # rate is given in spikes per time unit of spike_times; bursts use
+    # max_burst_isi, by default half of the mean inter-spike interval
+    spike_times = np.asarray(spike_times, dtype=float)
+    isi = np.diff(spike_times)
+    features = {
+        "spike_times":  spike_times,
+        "n_spikes":     len(spike_times),
+        "rate":         len(spike_times) / duration,
+        "isi_mean":     isi.mean() if len(isi) else np.nan,
+        "isi_std":      isi.std() if len(isi) else np.nan,
+    }
+    features["isi_cv"] = features["isi_std"] / features["isi_mean"] if len(isi) else np.nan
+
+    if max_burst_isi is None:
+        max_burst_isi = 0.5 * features["isi_mean"] if len(isi) else 0.
+    bursts = detect_bursts(spike_times, max_burst_isi, min_burst_spikes)
+    features["bursts"] = bursts
+    features["n_bursts"] = len(bursts)
+    return features
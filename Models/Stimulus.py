@@ -0,0 +1,235 @@
+__author__ = "Devrim Celik"
+
+"""
+Stimulus protocols: a protocol is a sum of components (steps, ramps,
+sinusoids, noise, pulse trains), each active in a window [t_on, t_off). It is
+evaluated once per sample grid into a cached, read-only waveform of unit
+amplitude; the simulation and the plot both use _I times this waveform, so
+they always show the same current and a slider move only rescales it.
+
+Samples are indexed like in the step loops: sample i lies at t = i*dt and a
+window covers the samples round(t_on/dt) <= i < round(t_off/dt).
+
+Example:
+    protocol = Protocol(Step(100, 400), Sine(400, 700, amplitude=0.5, frequency=0.01))
+    I = protocol.current(10, 2001, 0.5)
+"""
+
+from threading import Lock
+
+import numpy as np
+
+from Models.Result_Cache import quantize
+from Models.Streaming import step_window
+
+#==============================================================================#
+
+class Component:
+    # piecewise constant components can be integrated segment by segment
+    # (see Protocol.segments), the others are evaluated at every step
+    constant = True
+
+    def __init__(self, t_on, t_off):
+        self.t_on   =   float(t_on)
+        self.t_off  =   float(t_off)
+
+    def key(self):
+        return (type(self).__name__,) + tuple(sorted(vars(self).items()))
+
+    def edges(self):
+        # times at which the component switches
+        return [self.t_on, self.t_off]
+
+    def window(self, indices, dt):
+        return step_window(indices, self.t_on, self.t_off, dt)
+
+    def values(self, indices, dt):
+        # values at the sample indices
+        indices = np.asarray(indices)
+        return np.where(self.window(indices, dt), self.shape(indices * dt, indices, dt), 0.)
+
+    def at(self, t, dt=None):
+        # value at an arbitrary time, for solvers with their own steps
+        if not self.t_on <= t < self.t_off:
+            return 0.
+        return float(self.shape(np.float64(t), None, dt))
+
+    def shape(self, t, indices, dt):
+        raise NotImplementedError
+
+
+class Step(Component):
+
+    def __init__(self, t_on, t_off, amplitude=1.):
+        super().__init__(t_on, t_off)
+        self.amplitude = float(amplitude)
+
+    def shape(self, t, indices, dt):
+        return np.full(np.shape(t), self.amplitude)
+
+
+class Ramp(Component):
+    # linear from start at t_on to stop at t_off
+    constant = False
+
+    def __init__(self, t_on, t_off, start=0., stop=1.):
+        super().__init__(t_on, t_off)
+        self.start  =   float(start)
+        self.stop   =   float(stop)
+
+    def shape(self, t, indices, dt):
+        return self.start + (self.stop - self.start) * (t - self.t_on) / (self.t_off - self.t_on)
+
+
+class Sine(Component):
+    # offset + amplitude * sin(2 pi frequency (t - t_on) + phase), the
+    # frequency in cycles per time unit of the model
+    constant = False
+
+    def __init__(self, t_on, t_off, amplitude=1., frequency=1., phase=0., offset=0.):
+        super().__init__(t_on, t_off)
+        self.amplitude  =   float(amplitude)
+        self.frequency  =   float(frequency)
+        self.phase      =   float(phase)
+        self.offset     =   float(offset)
+
+    def shape(self, t, indices, dt):
+        return self.offset + self.amplitude * np.sin(
+            2 * np.pi * self.frequency * (t - self.t_on) + self.phase)
+
+
+class Noise(Component):
+    # gaussian white noise, one value per sample (held constant in between).
+    # Values are drawn in chunks seeded by (seed, chunk number), so every
+    # sample index always gets the same value, also in streamed blocks
+    constant = False
+    CHUNK = 4096
+
+    def __init__(self, t_on, t_off, std=1., mean=0., seed=0):
+        super().__init__(t_on, t_off)
+        self.std    =   float(std)
+        self.mean   =   float(mean)
+        self.seed   =   int(seed)
+
+    def _draw(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        out = np.empty(indices.shape)
+        chunks = indices // self.CHUNK
+        for chunk in np.unique(chunks):
+            normal = np.random.default_rng((self.seed, int(chunk))).standard_normal(self.CHUNK)
+            mask = chunks == chunk
+            out[mask] = normal[indices[mask] - chunk * self.CHUNK]
+        return self.mean + self.std * out
+
+    def shape(self, t, indices, dt):
+        if indices is None:
+            indices = np.floor(t / dt + 1e-9)
+        return self._draw(indices)
+
+
+class PulseTrain(Component):
+    # pulses of the given width, one every period, starting at t_on
+
+    def __init__(self, t_on, t_off, amplitude=1., width=1., period=10.):
+        super().__init__(t_on, t_off)
+        self.amplitude  =   float(amplitude)
+        self.width      =   float(width)
+        self.period     =   float(period)
+
+    def edges(self):
+        starts = np.arange(self.t_on, self.t_off, self.period)
+        ends = np.minimum(starts + self.width, self.t_off)
+        return sorted({float(edge) for edge in np.concatenate((starts, ends))} | {self.t_off})
+
+    def shape(self, t, indices, dt):
+        if indices is None:
+            on = (t - self.t_on) % self.period < self.width
+        else:
+            since = indices - int(round(self.t_on / dt))
+            on = since % int(round(self.period / dt)) < int(round(self.width / dt))
+        return np.where(on, self.amplitude, 0.)
+
+
+class Protocol:
+
+    def __init__(self, *components):
+        self.components =   tuple(components)
+        self._cache     =   {}              # (samples, dt) -> waveform
+        self._lock      =   Lock()
+
+    def key(self):
+        return tuple(component.key() for component in self.components)
+
+    def __eq__(self, other):
+        return isinstance(other, Protocol) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return "Protocol{}".format(self.key())
+
+    def __getstate__(self):
+        # worker processes rebuild their own cache
+        return {"components": self.components}
+
+    def __setstate__(self, state):
+        self.__init__(*state["components"])
+
+    ######### Sampled
+    def values(self, indices, dt):
+        # unit-amplitude waveform at the sample indices (not cached, e.g. for
+        # the blocks of a stream)
+        indices = np.asarray(indices)
+        total = np.zeros(indices.shape)
+        for component in self.components:
+            total += component.values(indices, dt)
+        return total
+
+    def waveform(self, samples, dt):
+        # cached unit-amplitude waveform of samples samples
+        key = (int(samples), quantize(dt, 9))
+        with self._lock:
+            waveform = self._cache.get(key)
+        if waveform is None:
+            waveform = self.values(np.arange(samples), dt)
+            waveform.flags.writeable = False
+            with self._lock:
+                self._cache[key] = waveform
+        return waveform
+
+    def current(self, _I, samples, dt):
+        # stimulus current of amplitude _I
+        return _I * self.waveform(samples, dt)
+
+    ######### Continuous
+    @property
+    def piecewise_constant(self):
+        return all(component.constant for component in self.components)
+
+    def breakpoints(self):
+        return sorted({edge for component in self.components for edge in component.edges()})
+
+    def span(self):
+        # first and last breakpoint: the stimulus is off outside of them
+        breakpoints = self.breakpoints()
+        return breakpoints[0], breakpoints[-1]
+
+    def at(self, t, dt=None):
+        return sum(component.at(t, dt) for component in self.components)
+
+    def segments(self, _I, dt=None):
+        # breakpoints and the current in front of, between and after them:
+        # a number where the current is constant, otherwise a function of t
+        breakpoints = self.breakpoints()
+        edges = [-np.inf] + breakpoints + [np.inf]
+        levels = []
+        for t_start, t_end in zip(edges[:-1], edges[1:]):
+            active = [component for component in self.components
+                      if component.t_on < t_end and t_start < component.t_off]
+            if all(component.constant for component in active):
+                t = t_start if np.isfinite(t_start) else t_end - 1.
+                levels.append(_I * sum((component.at(t, dt) for component in active), 0.))
+            else:
+                levels.append(lambda t, _I=_I: _I * self.at(t, dt))
+        return breakpoints, levels
@@ -0,0 +1,57 @@
+__author__ = "Devrim Celik"
+
+"""
+Block-wise streaming of the model simulations: instead of returning the whole
+run at once, the state is yielded in blocks of fixed size while the integrator
+state is carried from one block to the next. Memory stays constant, so runs
+can be arbitrarily long (T=None runs forever).
+"""
+
+import numpy as np
+
+#==============================================================================#
+
+BLOCK_SIZE = 4096                           # samples per yielded block
+
+
+def n_samples(T, dt):
+    # number of samples of np.arange(0, T+dt, dt), as used by the models
+    return None if T is None else len(np.arange(0, T+dt, dt))
+
+
+def stream_blocks(run_block, initial_state, T, dt, block_size=BLOCK_SIZE):
+    # run_block(buffers, indices) has to advance the state variables: every
+    # buffer holds the carried sample at position 0, the steps fill the rest.
+    # Steps may still overwrite the sample before the current one (the spike
+    # peaks of LIF and Izhikevich), so the last sample of a block is only
+    # yielded together with the next block. Yields (time, *state) blocks.
+    total = n_samples(T, dt)
+    carry = [float(value) for value in initial_state]
+    start = 0
+    while True:
+        size = block_size if total is None else min(block_size, total - 1 - start)
+        indices = np.arange(start, start + size + 1)
+        buffers = [np.empty(size + 1) for _ in carry]
+        for buffer, value in zip(buffers, carry):
+            buffer[0] = value
+        if size > 0:
+            run_block(buffers, indices)
+
+        last = total is not None and start + size == total - 1
+        stop = size + 1 if last else size
+        yield (indices[:stop] * dt,) + tuple(buffer[:stop] for buffer in buffers)
+        if last:
+            return
+        carry = [buffer[-1] for buffer in buffers]
+        start += size
+
+
+def collect(stream):
+    # concatenate all blocks of a (finite) stream
+    blocks = list(zip(*stream))
+    return tuple(np.concatenate(parts) for parts in blocks)
+
+
+def step_window(indices, t_on, t_off, dt):
+    # True for samples inside the stimulus window [t_on, t_off)
+    return (indices >= int(round(t_on / dt))) & (indices < int(round(t_off / dt)))
@@ -0,0 +1,148 @@
+__author__ = "Devrim Celik"
+
+"""
+Chunked on-disk storage for long traces: every trace (V, W, u, m, h, n, ...)
+is written in fixed-size .npy chunks next to a small JSON index holding the
+parameters, dt and length. Readers memory-map only the chunks overlapping the
+requested time window.
+
+Layout of a store directory:
+    index.json
+    V_00000000.npy, V_00000001.npy, ...
+"""
+
+import json
+import os
+
+import numpy as np
+
+#==============================================================================#
+
+INDEX = "index.json"
+CHUNK_SIZE = 2**16                          # samples per chunk
+
+
+def chunk_path(path, name, chunk):
+    return os.path.join(path, "{}_{:08d}.npy".format(name, chunk))
+
+
+class TraceWriter:
+
+    def __init__(self, path, names, dt, t0=0., params=None, chunk_size=CHUNK_SIZE,
+                 dtype="float64"):
+        self.path       =   path
+        self.names      =   list(names)
+        self.dt         =   float(dt)
+        self.t0         =   float(t0)
+        self.params     =   dict(params or {})
+        self.chunk_size =   int(chunk_size)
+        self.dtype      =   np.dtype(dtype)
+        self.length     =   {name: 0 for name in self.names}     # samples written
+        self._buffer    =   {name: [] for name in self.names}
+        self._buffered  =   {name: 0 for name in self.names}
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, **blocks):
+        # append a block of samples to some (or all) traces
+        for name, block in blocks.items():
+            block = np.asarray(block, dtype=self.dtype).ravel()
+            self._buffer[name].append(block)
+            self._buffered[name] += len(block)
+            if self._buffered[name] >= self.chunk_size:
+                self._flush(name, final=False)
+
+    def _flush(self, name, final):
+        data = np.concatenate(self._buffer[name]) if self._buffer[name] else \
+            np.empty(0, dtype=self.dtype)
+        full = len(data) if final else (len(data) // self.chunk_size) * self.chunk_size
+        for start in range(0, full, self.chunk_size):
+            chunk = (self.length[name] + start) // self.chunk_size
+            np.save(chunk_path(self.path, name, chunk), data[start:start + self.chunk_size])
+        self.length[name] += full
+        self._buffer[name] = [data[full:]]
+        self._buffered[name] = len(data) - full
+
+    def close(self):
+        for name in self.names:
+            self._flush(name, final=True)
+        index = {"dt": self.dt, "t0": self.t0, "chunk_size": self.chunk_size,
+                 "dtype": self.dtype.str, "params": self.params,
+                 "traces": {name: self.length[name] for name in self.names}}
+        with open(os.path.join(self.path, INDEX), "w") as file:
+            json.dump(index, file, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # a failed run leaves no index, so the store cannot be opened half written
+        if exc_type is None:
+            self.close()
+
+
+class TraceReader:
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX)) as file:
+            index = json.load(file)
+        self.dt         =   index["dt"]
+        self.t0         =   index["t0"]
+        self.chunk_size =   index["chunk_size"]
+        self.dtype      =   np.dtype(index["dtype"])
+        self.params     =   index["params"]
+        self.lengths    =   index["traces"]
+
+    @property
+    def names(self):
+        return list(self.lengths)
+
+    def duration(self, name=None):
+        name = name or self.names[0]
+        return (self.lengths[name] - 1) * self.dt
+
+    def index_range(self, name, t_start=None, t_stop=None):
+        # sample indices [start, stop) covering the time window [t_start, t_stop]
+        length = self.lengths[name]
+        start = 0 if t_start is None else int(np.ceil((t_start - self.t0) / self.dt - 1e-9))
+        stop = length if t_stop is None else int(np.floor((t_stop - self.t0) / self.dt + 1e-9)) + 1
+        return max(start, 0), min(stop, length)
+
+    def read_samples(self, name, start, stop):
+        # samples [start, stop) of a trace, only the chunks needed are mapped
+        if stop <= start:
+            return np.empty(0, dtype=self.dtype)
+        parts = []
+        for chunk in range(start // self.chunk_size, (stop - 1) // self.chunk_size + 1):
+            data = np.load(chunk_path(self.path, name, chunk), mmap_mode="r")
+            offset = chunk * self.chunk_size
+            parts.append(data[max(start - offset, 0):stop - offset])
+        return np.concatenate(parts)
+
+    def read(self, name, t_start=None, t_stop=None):
+        return self.read_samples(name, *self.index_range(name, t_start, t_stop))
+
+    def time(self, name=None, t_start=None, t_stop=None):
+        start, stop = self.index_range(name or self.names[0], t_start, t_stop)
+        return self.t0 + np.arange(start, stop) * self.dt
+
+    def __getitem__(self, name):
+        return self.read(name)
+
+
+def write_traces(path, traces, dt, t0=0., params=None, chunk_size=CHUNK_SIZE,
+                 dtype="float64"):
+    # store complete traces, e.g. the result of one model call
+    with TraceWriter(path, traces, dt, t0=t0, params=params, chunk_size=chunk_size,
+                     dtype=dtype) as writer:
+        writer.append(**traces)
+
+
+def write_stream(path, stream, names, dt, params=None, chunk_size=CHUNK_SIZE,
+                 dtype="float64"):
+    # store the (time, *state) blocks of a model stream (see Models/Streaming.py)
+    # with constant memory
+    with TraceWriter(path, names, dt, params=params, chunk_size=chunk_size,
+                     dtype=dtype) as writer:
+        for block in stream:
+            writer.append(**dict(zip(names, block[1:])))
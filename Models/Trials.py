@@ -0,0 +1,139 @@
+__author__ = "Devrim Celik"
+
+"""
+Multi-trial stochastic simulations: K noisy trials of one model run as a
+single batched array computation. White noise of strength sigma is added to
+the current (Euler-Maruyama), drawn from one seeded RNG stream per trial, so
+trial k sees the same noise whatever K or the other trials are. Statistics
+(mean and variance of V, PSTH, spike counts per trial) are accumulated while
+stepping, the trials themselves are never stored.
+
+Example:
+    stats = run_trials("LIF", K=500, sigma=0.0005, _I=0.002, seed=1)
+    stats["psth"], stats["V_mean"], stats["V_var"]
+"""
+
+import importlib
+
+import numpy as np
+
+from Models.Population_Executor import STEPS
+from Models.Hodgkin_Huxley_Interactive import HH_gates, rush_larsen_step, safe_rates
+
+#==============================================================================#
+
+def _safe_gates(V, dt):
+    # noisy trials pass V = -40 or -55 mV, where the raw m_alpha, n_alpha are 0/0
+    return HH_gates(V, dt, safe_rates)
+
+def _step_HH(s, p, I, dt):
+    # Rush-Larsen step of Hodgkin_Huxley_Interactive.rush_larsen(); spikes
+    # are upward crossings of 0 mV
+    V = s["V"]
+    below = V < 0.
+    V[:], s["m"][:], s["h"][:], s["n"][:] = rush_larsen_step(
+        V, s["m"], s["h"], s["n"], I, dt, p["g_Na"], p["g_K"], p["g_Leak"],
+        p["E_Na"], p["E_K"], p["E_Leak"], _safe_gates)
+    return below & (V >= 0.)
+
+
+# model: (module, default _I, initial state, parameter defaults, dt, T,
+# substeps per sample, current sample offset, spike sample offset, value of
+# the sample before a reset), matching the single neuron engines
+MODELS = {
+    "LIF":              ("Models.LIF_Interactive", 0.005,
+                         {"V": -0.065}, {"gl": 0.16, "Cm": 0.0049},
+                         0.00002, 0.100, 1, 1, 0, 0.04),
+    "Izhikevich":       ("Models.Izhikevich_Interactive", 10.,
+                         {"V": -70., "u": -14.}, {"a": 0.02, "b": 0.2, "c": -65., "d": 8.},
+                         0.5, 1000, 1, 0, 0, 35.),
+    "FitzHugh_Nagumo":  ("Models.FitzHugh_Nagumo_Interactive", 0.5,
+                         {"V": -0.7, "W": -0.5}, {"a": 0.7, "b": 0.8, "tau": 1 / 0.08},
+                         0.01, 400, 1, 1, 1, None),
+    "HH":               ("Models.Hodgkin_Huxley_Interactive", 7.,
+                         {"V": -65., "m": 0.05, "h": 0.6, "n": 0.32},
+                         {"g_Na": 120., "g_K": 36., "g_Leak": 0.3, "E_Na": 50., "E_K": -77.,
+                          "E_Leak": -54.387},
+                         0.1, 400, 4, 0, 1, None),
+}
+STEPS = dict(STEPS, HH=_step_HH)
+
+NOISE_BLOCK = 2**20                         # noise values drawn at once
+
+
+def trial_generators(seed, K):
+    # one independent, reproducible RNG stream per trial
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(K)]
+
+
+def run_trials(model, K=100, sigma=0., _I=None, params=None, seed=None, bin_width=None,
+               protocol=None):
+    # sigma: noise strength in current units per sqrt(time unit); params as
+    # keywords of the model (scalars, or arrays of K for per-trial values);
+    # bin_width of the PSTH in the model's time unit (default: 1/100 of T)
+    if model not in MODELS:
+        raise ValueError("Unknown model '{}', use one of {}".format(model, sorted(MODELS)))
+    module, default_I, states, defaults, dt, T, substeps, offset, spike_offset, peak = \
+        MODELS[model]
+    _I = default_I if _I is None else _I
+    protocol = protocol or importlib.import_module(module).PROTOCOL
+    step = STEPS[model]
+
+    ######### Time
+    samples     =   len(np.arange(0, T+dt, dt))
+    h           =   dt / substeps           # integration step
+    n_steps     =   (samples - 1) * substeps
+    bins        =   max(1, int(round((bin_width or T / 100) / dt)))
+
+    ######### Trials (state and parameters, one entry per trial)
+    s = {name: np.full(K, value) for name, value in states.items()}
+    p = {name: np.broadcast_to(np.asarray(value, dtype=float), (K,))
+         for name, value in dict(defaults, **(params or {})).items()}
+    amplitude = np.broadcast_to(np.asarray(_I, dtype=float), (K,))
+    stimulus = protocol.values(np.arange(n_steps + 1), h)
+    generators = trial_generators(seed, K)
+    block = max(1, NOISE_BLOCK // K)
+
+    ######### Online statistics
+    V_mean      =   np.empty(samples)
+    V_var       =   np.empty(samples)
+    spikes      =   np.zeros(samples, dtype=np.int64)   # over all trials
+    counts      =   np.zeros(K, dtype=np.int64)         # per trial
+    previous    =   s["V"].copy()           # last sample, until its peak is known
+
+    for k in range(n_steps):
+        if k % block == 0:
+            size = min(block, n_steps - k)
+            noise = np.stack([g.standard_normal(size) for g in generators], axis=1)
+        # Euler-Maruyama: white noise of variance sigma^2/h as part of the current
+        I = amplitude * stimulus[k + offset]
+        if sigma:
+            I = I + sigma / np.sqrt(h) * noise[k % block]
+        spike = step(s, p, I, h)
+
+        sample, last = divmod(k + 1, substeps)
+        if spike.any():
+            counts += spike
+            spikes[(k + spike_offset * substeps) // substeps] += spike.sum()
+            if peak is not None:
+                previous[spike] = peak
+        if last == 0:
+            # the sample before is final now
+            V_mean[sample - 1] = previous.mean()
+            V_var[sample - 1] = previous.var()
+            previous = s["V"].copy()
+    V_mean[-1] = previous.mean()
+    V_var[-1] = previous.var()
+
+    ######### PSTH (rate per trial, in spikes per time unit)
+    edges = np.arange(0, samples, bins)
+    widths = np.diff(np.append(edges, samples)) * dt     # the last bin may be shorter
+    psth = np.add.reduceat(spikes, edges) / (K * widths)
+    return {
+        "time":         np.arange(samples) * dt,
+        "V_mean":       V_mean,
+        "V_var":        V_var,
+        "psth_time":    edges * dt,
+        "psth":         psth,
+        "spike_counts": counts,
+    }
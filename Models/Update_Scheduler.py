@@ -0,0 +1,57 @@
+__author__ = "Devrim Celik"
+
+"""
+Coalescing update scheduler for the interactive plots: slider events only mark
+an update as pending, and at most one recompute per display frame is run,
+always with the latest slider state
+"""
+
+from matplotlib.backend_bases import TimerBase
+
+#==============================================================================#
+
+FRAME_INTERVAL = 1000 / 60                  # [ms], one display frame at 60 Hz
+
+
+class UpdateScheduler:
+
+    def __init__(self, fig, update, interval=FRAME_INTERVAL, redraw=None):
+        self.fig        =   fig
+        self.update     =   update          # callback, reads the slider values
+        self.redraw     =   redraw or fig.canvas.draw_idle
+        self.requested  =   0               # number of slider events
+        self.executed   =   0               # number of recomputes actually run
+        self._pending   =   False
+        self._val       =   None
+        self._timer     =   fig.canvas.new_timer(interval=max(1, int(interval)))
+        self._timer.single_shot = True
+        self._timer.add_callback(self._run)
+        # non-interactive backends (e.g. Agg) come without a working event
+        # loop, there every request is executed right away
+        self._synchronous = type(self._timer) is TimerBase
+
+    def request(self, val=None):
+        # hook for Slider.on_changed / Button.on_clicked
+        self.requested += 1
+        self._val = val
+        if self._synchronous:
+            self._pending = True
+            self._run()
+        elif not self._pending:
+            # later requests within this frame are merged into this one
+            self._pending = True
+            self._timer.start()
+
+    def flush(self):
+        # run a pending update immediately
+        if self._pending:
+            self._timer.stop()
+            self._run()
+
+    def _run(self):
+        if not self._pending:
+            return
+        self._pending = False
+        self.executed += 1
+        self.update(self._val)
+        self.redraw()
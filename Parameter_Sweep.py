@@ -0,0 +1,200 @@
+__author__ = "Devrim Celik"
+
+"""
+Headless parameter sweeps: runs a model over a grid of parameters on all
+cores and writes every grid point to disk as soon as it is finished, either as one
+.npz file per point or (--chunked) as a chunked trace store per point, see
+Models/Trace_Storage.py. With --spikes only the spike times and spike
+features are stored instead of the traces. Points that are already on disk
+are skipped, so a killed sweep resumes where it stopped.
+
+Example:
+    python Parameter_Sweep.py Izhikevich sweep_iz --param a=0.01:0.1:10 \\
+        --param d=2,4,8 --outputs V
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from Models.Trace_Storage import TraceReader, write_traces
+from Models.Spike_Features import spike_features
+
+#==============================================================================#
+
+# model -> (module, function, parameters with defaults, returned traces, dt)
+MODELS = {
+    "LIF": ("Models.LIF_Interactive", "LIF",
+            [("_I", 0.005), ("gl", 0.16), ("Cm", 0.0049)],
+            ["V"], 0.00002),
+    "HH": ("Models.Hodgkin_Huxley_Interactive", "HH",
+           [("_I", 7.), ("g_Na", 120.), ("g_K", 36.), ("g_Leak", 0.3),
+            ("E_Na", 50.), ("E_K", -77.), ("E_Leak", -54.387)],
+           ["V", "m", "h", "n"], 0.1),
+    "Izhikevich": ("Models.Izhikevich_Interactive", "Izhikevich_Model",
+                   [("_I", 10.), ("a", 0.02), ("b", 0.2), ("c", -65.), ("d", 8.)],
+                   ["V"], 0.5),
+    "FitzHugh_Nagumo": ("Models.FitzHugh_Nagumo_Interactive", "FitzHugh_Nagumo",
+                        [("_I", 0.5), ("a", 0.7), ("b", 0.8), ("tau", 12.5)],
+                        ["V", "W"], 0.01),
+}
+
+MANIFEST = "manifest.json"
+
+
+def parse_values(spec):
+    # "start:stop:num" (inclusive linspace) or "v1,v2,..."
+    if ":" in spec:
+        start, stop, num = spec.split(":")
+        return np.linspace(float(start), float(stop), int(num)).tolist()
+    return [float(value) for value in spec.split(",")]
+
+
+def build_grid(model, param_specs):
+    parameters = MODELS[model][2]
+    names = [name for name, _ in parameters]
+    axes = {name: [default] for name, default in parameters}
+    for spec in param_specs:
+        name, _, values = spec.partition("=")
+        if name not in axes:
+            raise ValueError("{} has no parameter '{}', choose from {}".format(
+                model, name, ", ".join(names)))
+        axes[name] = parse_values(values)
+    return names, [axes[name] for name in names]
+
+
+def point_path(out_dir, index, chunked=False):
+    return os.path.join(out_dir, "point_{:08d}{}".format(index, "" if chunked else ".npz"))
+
+
+def run_point(model, index, params, outputs, out_dir, dtype, chunked=False,
+              spikes=False):
+    # runs in a worker process and writes its result itself, so traces are
+    # never sent back to the parent
+    module, function, parameters, traces, dt = MODELS[model]
+    func = getattr(importlib.import_module(module), function)
+    result = func(*params, return_spikes=spikes)
+    if spikes:
+        *result, spike_times = result
+        features = spike_features(spike_times, (len(result[0]) - 1) * dt)
+        arrays = {name: np.asarray(value) for name, value in features.items()}
+    else:
+        if len(traces) == 1:
+            result = (result,)
+        arrays = {name: np.asarray(trace, dtype=dtype)
+                  for name, trace in zip(traces, result) if name in outputs}
+
+    # write to a temporary file first, a point only counts once it is complete
+    path = point_path(out_dir, index, chunked)
+    if chunked:
+        tmp_path = path + ".tmp"
+        write_traces(tmp_path, arrays, dt, dtype=dtype,
+                     params={name: value for (name, _), value in zip(parameters, params)})
+    else:
+        tmp_path = path[:-4] + ".tmp.npz"
+        np.savez(tmp_path, params=np.asarray(params), **arrays)
+    os.replace(tmp_path, path)
+    return index
+
+
+def write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path) as file:
+            previous = json.load(file)
+        if previous != manifest:
+            raise ValueError("{} holds a different sweep, use a new output "
+                             "directory".format(out_dir))
+        return
+    with open(path, "w") as file:
+        json.dump(manifest, file, indent=2)
+
+
+def run_sweep(model, out_dir, param_specs=(), outputs=None, workers=None,
+              dtype="float64", chunked=False, spikes=False, verbose=True):
+    names, axes = build_grid(model, param_specs)
+    traces = MODELS[model][3]
+    outputs = [] if spikes else list(outputs or traces)
+    chunked = chunked and not spikes
+    unknown = set(outputs) - set(traces)
+    if unknown:
+        raise ValueError("{} returns {}, not {}".format(
+            model, ", ".join(traces), ", ".join(sorted(unknown))))
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_manifest(out_dir, {"model": model, "parameters": names, "grid": axes,
+                             "outputs": outputs, "dtype": dtype, "chunked": chunked,
+                             "spikes": spikes})
+
+    total = int(np.prod([len(axis) for axis in axes]))
+    todo = ((index, params) for index, params in enumerate(itertools.product(*axes))
+            if not os.path.exists(point_path(out_dir, index, chunked)))
+
+    workers = workers or os.cpu_count() or 1
+    done = total - sum(1 for index in range(total)
+                       if not os.path.exists(point_path(out_dir, index, chunked)))
+    if verbose:
+        print("{}: {} grid points, {} already done".format(model, total, done))
+
+    # keep only a few jobs per worker in flight, so huge grids are never
+    # materialized as futures
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for index, params in todo:
+            pending.add(executor.submit(run_point, model, index, params,
+                                        outputs, out_dir, dtype, chunked, spikes))
+            if len(pending) >= 4 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                done += _collect(finished, total, done, verbose)
+        finished, _ = wait(pending)
+        done += _collect(finished, total, done, verbose)
+
+    return done
+
+
+def _collect(finished, total, done, verbose):
+    for future in finished:
+        future.result()                     # re-raise errors of the workers
+        done += 1
+        if verbose and (done % 100 == 0 or done == total):
+            print("{}/{} grid points".format(done, total))
+    return len(finished)
+
+
+def load_point(out_dir, index):
+    # .npz points are loaded completely, chunked points return a TraceReader
+    if os.path.isdir(point_path(out_dir, index, chunked=True)):
+        return TraceReader(point_path(out_dir, index, chunked=True))
+    with np.load(point_path(out_dir, index)) as data:
+        return {name: data[name] for name in data.files}
+
+#==============================================================================#
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless parameter sweep of a neuron model.")
+    parser.add_argument("model", choices=sorted(MODELS))
+    parser.add_argument("out_dir", help="directory for the results, reused to resume")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUES",
+                        help="parameter values as start:stop:num or v1,v2,...; "
+                             "parameters without --param keep their default")
+    parser.add_argument("--outputs", nargs="+", help="traces to store (default: all)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--float32", action="store_true", help="store traces as float32")
+    parser.add_argument("--chunked", action="store_true",
+                        help="store every point as a chunked trace store instead of .npz")
+    parser.add_argument("--spikes", action="store_true",
+                        help="store spike times and spike features instead of traces")
+    args = parser.parse_args(argv)
+
+    run_sweep(args.model, args.out_dir, args.param, outputs=args.outputs,
+              workers=args.workers, dtype="float32" if args.float32 else "float64",
+              chunked=args.chunked, spikes=args.spikes)
+
+
+if (__name__ == "__main__"):
+    main()
@@ -0,0 +1,25 @@
+import pytest
+
+from FI_Table import STATES, measure
+
+# Izhikevich (2003) presets: a, b, c, d
+RS = (0.02, 0.2, -65, 8)
+IB = (0.02, 0.2, -55, 4)
+CH = (0.02, 0.2, -50, 2)
+
+
+@pytest.mark.parametrize("params, _I, state", [
+    (RS, 10, "tonic"),
+    (RS, 15, "tonic"),
+    (IB, 15, "bursting"),
+    (CH, 10, "bursting"),
+    (CH, 15, "bursting"),
+])
+def test_izhikevich_firing_states(params, _I, state):
+    rate, index = measure("Izhikevich", (_I,) + params)
+    assert rate > 0
+    assert STATES[index] == state
+
+
+def test_quiescent_below_rheobase():
+    assert STATES[measure("Izhikevich", (0,) + RS)[1]] == "quiescent"
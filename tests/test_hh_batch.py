@@ -0,0 +1,28 @@
+import numpy as np
+
+from Models.Hodgkin_Huxley_Interactive import BATCH_MIN_CELLS, HH, HH_batch
+
+_I = np.array([0., 5., 7., 10., 15., 20., 30., 40., 12., 8.])
+g_K = np.linspace(25., 45., len(_I))
+
+
+def test_small_batch_equals_single_cells():
+    cells = BATCH_MIN_CELLS - 1
+    *batch, spikes = HH_batch(_I[:cells], g_K=g_K[:cells], return_spikes=True)
+    for k in range(cells):
+        *single, single_spikes = HH(_I[k], g_K=g_K[k], solver="rush_larsen",
+                                    return_spikes=True)
+        for trace, single_trace in zip(batch, single):
+            np.testing.assert_array_equal(trace[k], single_trace)
+        np.testing.assert_array_equal(spikes[k], single_spikes)
+
+
+def test_vectorized_batch_matches_single_cells():
+    *batch, spikes = HH_batch(_I, g_K=g_K, return_spikes=True)
+    assert len(_I) >= BATCH_MIN_CELLS
+    for k in range(len(_I)):
+        *single, single_spikes = HH(_I[k], g_K=g_K[k], solver="rush_larsen",
+                                    return_spikes=True)
+        for trace, single_trace in zip(batch, single):
+            np.testing.assert_allclose(trace[k], single_trace, atol=1e-8)
+        np.testing.assert_allclose(spikes[k], single_spikes, atol=1e-8)
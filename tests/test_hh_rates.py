@@ -0,0 +1,37 @@
+import numpy as np
+
+from Models.Hodgkin_Huxley_Interactive import (HH, HH_jacobian, HH_rhs, get_rate_table,
+                                               safe_rates)
+from Models.Stimulus import Protocol, PulseTrain, Step
+
+PARAMS = (120., 36., 0.3, 50., -77., -54.387)
+
+
+def test_jacobian_finite_at_rate_singularities():
+    for V in (-40., -55., np.array([-40., -55., -65.])):
+        X = (V, 0.1, 0.5, 0.3)
+        J = np.array(HH_jacobian(0., X, 0., *PARAMS, rates=safe_rates), dtype=object)
+        assert all(np.all(np.isfinite(np.asarray(value, dtype=float))) for value in J.ravel())
+
+
+def test_jacobian_matches_finite_differences_near_singularities():
+    for V in (-40., -55., -40. + 1e-3, -55. - 1e-3, -20.):
+        X = np.array([V, 0.1, 0.5, 0.3])
+        J = np.array(HH_jacobian(0., X, 0., *PARAMS), dtype=float)
+        step = 1e-5
+        numeric = np.empty((4, 4))
+        for j in range(4):
+            dX = np.zeros(4)
+            dX[j] = step
+            numeric[:, j] = (np.array(HH_rhs(0., X + dX, 0., *PARAMS, rates=safe_rates))
+                             - np.array(HH_rhs(0., X - dX, 0., *PARAMS, rates=safe_rates))) / (2 * step)
+        np.testing.assert_allclose(J, numeric, rtol=1e-5, atol=1e-7)
+
+
+def test_gate_tables_only_for_the_regular_step():
+    # breakpoints off the sample grid leave short steps in front of them
+    protocol = Protocol(Step(40.03, 300.07), PulseTrain(100.013, 200, amplitude=2, width=1.03,
+                                                        period=7.7))
+    table = get_rate_table(0.01)
+    HH(10, solver="rush_larsen", protocol=protocol, rate_table=0.01)
+    assert len(table._gates) == 1
@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+
+from Models import Kernels
+from Models.Kernels import PYTHON_KERNELS
+from Models.FitzHugh_Nagumo_Interactive import FitzHugh_Nagumo
+from Models.Izhikevich_Interactive import Izhikevich_Model
+from Models.LIF_Interactive import LIF
+
+# arguments of every step loop; output arrays are zeroed so that samples
+# past the returned count compare equal as well
+
+
+def _LIF():
+    n = 5001
+    V = np.zeros(n)
+    V[0] = -0.065
+    I = np.where((np.arange(n) >= 1000) & (np.arange(n) < 4000), 0.01, 0.)
+    return V, I, 0.16, 0.0049, -0.065, -0.050, 0.00002, np.zeros(n, dtype=np.int64)
+
+
+def _FitzHugh_Nagumo():
+    n = 40001
+    V, W = np.zeros(n), np.zeros(n)
+    V[0], W[0] = -0.7, -0.5
+    I = np.where((np.arange(n) >= 5000) & (np.arange(n) < 35000), 0.6, 0.)
+    return V, W, I, 0.7, 0.8, 12.5, 0.01
+
+
+def _Izhikevich():
+    n = 2001
+    V, u = np.zeros(n), np.zeros(n)
+    V[0], u[0] = -70., -14.
+    I = np.where((np.arange(n) >= 200) & (np.arange(n) < 1500), 10., 0.)
+    return V, u, I, 0.02, 0.2, -50., 2., 35., 0.5, np.zeros(n, dtype=np.int64)
+
+
+def _LIF_exact():
+    n = 4096
+    edges, levels = np.array([0.020, 0.080]), np.array([0., 0.01, 0.])
+    return (edges, levels, -0.065, 0.16, 0.0049, -0.065, -0.050, 0.100, 0.0005,
+            np.zeros(n), np.zeros(n), np.zeros(n))
+
+
+def _Izhikevich_adaptive():
+    n = 16384
+    edges, levels = np.array([100., 750.]), np.array([0., 10., 0.])
+    return (edges, levels, -70., -14., 0.02, 0.2, -50., 2., 35., 1000., 1e-4, 1e-4,
+            np.inf, np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n))
+
+
+ARGUMENTS = {
+    "LIF":                  _LIF,
+    "FitzHugh_Nagumo":      _FitzHugh_Nagumo,
+    "Izhikevich":           _Izhikevich,
+    "LIF_exact":            _LIF_exact,
+    "Izhikevich_adaptive":  _Izhikevich_adaptive,
+}
+
+
+# step loops of the engines before the kernels were split out, at the
+# engines' default parameters
+def _baseline_LIF(_I=0.005, gl=0.16, Cm=0.0049):
+    El, thresh, dt = -0.065, -0.050, 0.00002
+    V = np.empty(5001)
+    V[0] = El
+    I = np.zeros(5001)
+    I[1000:4000] = _I
+    for i in range(1, len(V)):
+        V[i] = V[i-1] + (I[i] - gl*(V[i-1]-El))/Cm*dt
+        if V[i] > thresh:
+            V[i-1] = 0.04
+            V[i] = El
+    return (V,)
+
+
+def _baseline_FitzHugh_Nagumo(_I=0.5, a=0.7, b=0.8, tau=1 / 0.08):
+    dt = 0.01
+    V, W = np.empty(40001), np.empty(40001)
+    V[0], W[0] = -0.7, -0.5
+    I = np.zeros(40001)
+    I[5000:35000] = _I
+    for i in range(1, len(V)):
+        V[i] = V[i - 1] + (V[i - 1] - (V[i - 1]**3) / 3 - W[i - 1] + I[i]) * dt
+        W[i] = W[i - 1] + ((V[i - 1] + a - b * W[i - 1]) / tau) * dt
+    return V, W
+
+
+def _baseline_Izhikevich(_I=10, a=0.02, b=0.2, c=-65, d=8):
+    spike_value, dt = 35, 0.5
+    V, u = np.zeros(2001), np.zeros(2001)
+    V[0], u[0] = -70, -14
+    I = np.zeros(2001)
+    I[200:1500] = _I
+    for t in range(1, len(V)):
+        if V[t-1] < spike_value:
+            dV = (0.04 * V[t-1] + 5) * V[t-1] + 140 - u[t-1]
+            V[t] = V[t-1] + (dV + I[t-1]) * dt
+            u[t] = u[t-1] + dt * (a * (b * V[t-1] - u[t-1]))
+        else:
+            V[t-1] = spike_value
+            V[t] = c
+            u[t] = u[t-1] + d
+    return V, u
+
+
+def _kernel_LIF():
+    V = np.empty(5001)
+    V[0] = -0.065
+    I = np.zeros(5001)
+    I[1000:4000] = 0.005
+    PYTHON_KERNELS["LIF"](V, I, 0.16, 0.0049, -0.065, -0.050, 0.00002,
+                          np.empty(5001, dtype=np.int64))
+    return (V,)
+
+
+def _kernel_FitzHugh_Nagumo():
+    V, W = np.empty(40001), np.empty(40001)
+    V[0], W[0] = -0.7, -0.5
+    I = np.zeros(40001)
+    I[5000:35000] = 0.5
+    PYTHON_KERNELS["FitzHugh_Nagumo"](V, W, I, 0.7, 0.8, 1 / 0.08, 0.01)
+    return V, W
+
+
+def _kernel_Izhikevich():
+    V, u = np.zeros(2001), np.zeros(2001)
+    V[0], u[0] = -70, -14
+    I = np.zeros(2001)
+    I[200:1500] = 10
+    PYTHON_KERNELS["Izhikevich"](V, u, I, 0.02, 0.2, -65, 8, 35, 0.5,
+                                 np.empty(2001, dtype=np.int64))
+    return V, u
+
+
+@pytest.mark.parametrize("baseline, kernel, engine", [
+    (_baseline_LIF, _kernel_LIF, lambda: (LIF(),)),
+    (_baseline_FitzHugh_Nagumo, _kernel_FitzHugh_Nagumo, FitzHugh_Nagumo),
+    (_baseline_Izhikevich, _kernel_Izhikevich, lambda: (Izhikevich_Model(),)),
+])
+def test_python_kernels_match_baseline(baseline, kernel, engine):
+    expected = baseline()
+    for trace, expected_trace in zip(kernel(), expected):
+        np.testing.assert_array_equal(trace, expected_trace)
+    # the engines run whichever backend is selected
+    for trace, expected_trace in zip(engine(), expected):
+        np.testing.assert_allclose(trace, expected_trace, rtol=1e-9, atol=1e-12)
+
+
+def test_every_kernel_has_arguments():
+    assert set(ARGUMENTS) == set(Kernels.PYTHON_KERNELS)
+
+
+@pytest.mark.skipif(not Kernels.NUMBA_AVAILABLE, reason="Numba is not installed")
+@pytest.mark.parametrize("name", sorted(ARGUMENTS))
+def test_numba_matches_python(name):
+    python_args, numba_args = ARGUMENTS[name](), ARGUMENTS[name]()
+    python_out = Kernels.get_kernel(name, "python")(*python_args)
+    numba_out = Kernels.get_kernel(name, "numba")(*numba_args)
+
+    np.testing.assert_allclose(np.array(numba_out, dtype=float),
+                               np.array(python_out, dtype=float), rtol=0, atol=0)
+    for python_arg, numba_arg in zip(python_args, numba_args):
+        if isinstance(python_arg, np.ndarray):
+            np.testing.assert_allclose(numba_arg, python_arg, rtol=1e-9, atol=1e-12)
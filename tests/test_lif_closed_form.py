@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from Models.LIF_Interactive import LIF_adaptive, LIF_spike_times, LIF_trace
+from Models.Stimulus import Protocol, Ramp, Step
+
+
+@pytest.mark.parametrize("protocol", [None, Protocol(Step(0.010, 0.090, amplitude=1.5))])
+def test_spike_times_match_exact_integrator(protocol):
+    _I = np.array([0.002, 0.005, 0.01, 0.02])
+    count, spike_times = LIF_spike_times(_I, protocol=protocol)
+    for k in range(len(_I)):
+        exact = LIF_adaptive(_I[k], return_spikes=True, protocol=protocol)[2]
+        assert count[k] == len(exact)
+        np.testing.assert_allclose(spike_times[k, :count[k]], exact, atol=1e-9)
+
+
+def test_other_protocols_are_rejected():
+    protocol = Protocol(Ramp(0.020, 0.080))
+    with pytest.raises(ValueError):
+        LIF_spike_times(0.01, protocol=protocol)
+    with pytest.raises(ValueError):
+        LIF_trace(0.01, protocol=protocol)
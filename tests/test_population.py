@@ -0,0 +1,29 @@
+import numpy as np
+
+from Models.FitzHugh_Nagumo_Interactive import FitzHugh_Nagumo
+from Models.Izhikevich_Interactive import Izhikevich_Model, Izhikevich_Population
+from Models.LIF_Interactive import LIF
+from Models.Population_Executor import PopulationExecutor
+
+
+def test_izhikevich_population_matches_single_neurons():
+    _I, d = np.array([5., 10., 15.]), np.array([8., 4., 2.])
+    V, spike_times = Izhikevich_Population(_I, d=d)
+    for k in range(len(_I)):
+        V_single, spikes = Izhikevich_Model(_I[k], d=d[k], return_spikes=True)
+        np.testing.assert_array_equal(V[k], V_single)
+        np.testing.assert_array_equal(spike_times[k], spikes)
+
+
+def test_executor_spike_counts_match_engines():
+    engines = {
+        "Izhikevich":       (Izhikevich_Model, [5., 10., 15.], 1000),
+        "LIF":              (LIF, [0.005, 0.01, 0.02], 0.100),
+        "FitzHugh_Nagumo":  (FitzHugh_Nagumo, [0.33, 0.5, 0.9], 400),
+    }
+    for model, (engine, _I, T) in engines.items():
+        with PopulationExecutor(model, _I=np.array(_I), workers=0) as pop:
+            pop.run(T)
+            counts = pop.spike_counts.copy()
+        expected = [len(engine(value, return_spikes=True)[-1]) for value in _I]
+        np.testing.assert_array_equal(counts, expected, err_msg=model)
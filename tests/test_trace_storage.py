@@ -0,0 +1,23 @@
+import os
+
+import numpy as np
+import pytest
+
+from Models.Trace_Storage import INDEX, TraceReader, TraceWriter
+
+
+def test_round_trip(tmp_path):
+    V = np.linspace(-70, 30, 1000)
+    with TraceWriter(str(tmp_path), ["V"], dt=0.1, chunk_size=64) as writer:
+        for block in np.array_split(V, 7):
+            writer.append(V=block)
+    reader = TraceReader(str(tmp_path))
+    np.testing.assert_array_equal(reader.read_samples("V", 0, len(V)), V)
+
+
+def test_no_index_after_an_error(tmp_path):
+    with pytest.raises(RuntimeError):
+        with TraceWriter(str(tmp_path), ["V"], dt=0.1, chunk_size=64) as writer:
+            writer.append(V=np.zeros(100))
+            raise RuntimeError("simulation failed")
+    assert not os.path.exists(os.path.join(str(tmp_path), INDEX))
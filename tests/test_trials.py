@@ -0,0 +1,32 @@
+import numpy as np
+
+from Models.Hodgkin_Huxley_Interactive import HH
+from Models.Trials import MODELS, STEPS, run_trials
+
+
+def test_HH_step_at_rate_singularities():
+    # m_alpha is 0/0 at -40 mV, n_alpha at -55 mV
+    _, _, states, params, dt, *_ = MODELS["HH"]
+    V = np.array([-40., -55., -65.])
+    s = {name: np.full(3, value) for name, value in states.items()}
+    s["V"][:] = V
+    p = {name: np.full(3, value) for name, value in params.items()}
+    STEPS["HH"](s, p, np.zeros(3), dt / 4)
+    for value in s.values():
+        assert np.all(np.isfinite(value))
+
+
+def test_HH_noise_free_trials_match_engine():
+    stats = run_trials("HH", K=2, sigma=0., _I=7, seed=0)
+    V = HH(7, solver="rush_larsen")[0]
+    np.testing.assert_allclose(stats["V_mean"], V, atol=1e-8)
+    assert np.all(stats["V_var"] < 1e-12)
+
+
+def test_psth_rate_of_short_last_bin():
+    # 4001 samples in bins of 150: the last bin holds 101 samples
+    stats = run_trials("HH", K=3, sigma=2., _I=10, seed=0, bin_width=15.)
+    dt = stats["time"][1]
+    widths = np.diff(np.append(stats["psth_time"], stats["time"][-1] + dt))
+    assert widths[-1] < widths[0]
+    np.testing.assert_allclose((stats["psth"] * widths * 3).sum(), stats["spike_counts"].sum())